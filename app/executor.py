@@ -0,0 +1,73 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class BoundedExecutor:
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="mongosequelizer"
+        )
+        self.lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+
+    def submit(self, func, *args, **kwargs):
+
+        with self.lock:
+            self.queued += 1
+
+        return self.schedule(func, *args, **kwargs)
+
+    def try_submit(self, func, *args, **kwargs):
+
+        with self.lock:
+            if self.queued + self.running >= self.max_workers:
+                return None
+            self.queued += 1
+
+        return self.schedule(func, *args, **kwargs)
+
+    def schedule(self, func, *args, **kwargs):
+
+        def task():
+            with self.lock:
+                self.queued -= 1
+                self.running += 1
+            try:
+                return func(*args, **kwargs)
+            finally:
+                with self.lock:
+                    self.running -= 1
+
+        def on_done(future):
+            if future.cancelled():
+                with self.lock:
+                    self.queued -= 1
+
+        future = self.executor.submit(task)
+        future.add_done_callback(on_done)
+
+        return future
+
+    async def run(self, func, *args, **kwargs):
+        return await asyncio.wrap_future(self.submit(func, *args, **kwargs))
+
+    def status(self) -> dict:
+
+        with self.lock:
+            return {
+                "max_workers": self.max_workers,
+                "running": self.running,
+                "queued": self.queued,
+            }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+executor = BoundedExecutor(int(os.environ.get("MONGOSEQUELIZER_WORKERS", "4")))
+job_executor = BoundedExecutor(int(os.environ.get("MONGOSEQUELIZER_JOB_WORKERS", "4")))
+sync_executor = BoundedExecutor(int(os.environ.get("MONGOSEQUELIZER_SYNC_JOBS", "2")))
@@ -1,10 +1,30 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
+from app.executor import executor, job_executor, sync_executor
+from mongosequelizer.job import cancel_jobs
+from mongosequelizer.mongodb.mongodb import close_clients
+from mongosequelizer.postgresql.pool import close_pools
+from mongosequelizer.rdbms.rdbms import dispose_engines
 from routers import mongodb, rdbms
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    cancel_jobs()
+    executor.shutdown()
+    job_executor.shutdown()
+    sync_executor.shutdown()
+    close_clients()
+    dispose_engines()
+    close_pools()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -23,3 +43,13 @@ def root():
     return JSONResponse(
         content={"message": "GooseSeqlify API"}, status_code=status.HTTP_200_OK
     )
+
+
+@app.get("/status")
+def executor_status():
+    return JSONResponse(
+        content=dict(
+            executor.status(), jobs=job_executor.status(), syncs=sync_executor.status()
+        ),
+        status_code=status.HTTP_200_OK,
+    )
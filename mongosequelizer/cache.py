@@ -0,0 +1,116 @@
+import hashlib
+import os
+import pickle
+import stat
+import tempfile
+import time
+from typing import Optional
+
+CACHE_DIR = os.environ.get(
+    "MONGOSEQUELIZER_CACHE_DIR",
+    os.path.join(
+        os.environ.get(
+            "XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")
+        ),
+        "mongosequelizer",
+    ),
+)
+
+
+def check_cache_dir() -> bool:
+
+    try:
+        os.makedirs(CACHE_DIR, mode=0o700, exist_ok=True)
+        info = os.lstat(CACHE_DIR)
+
+    except OSError as e:
+        print(f"Cache directory {CACHE_DIR} is unavailable: {e}")
+        return False
+
+    if (
+        not stat.S_ISDIR(info.st_mode)
+        or info.st_uid != os.getuid()
+        or info.st_mode & 0o077
+    ):
+        print(
+            f"Cache directory {CACHE_DIR} must be a directory owned by the current user with mode 0700"
+        )
+        return False
+
+    return True
+
+
+def get_cache_path(namespace: str, key) -> str:
+
+    digest = hashlib.sha256(repr(key).encode("utf-8")).hexdigest()
+
+    return os.path.join(CACHE_DIR, namespace, f"{digest}.pickle")
+
+
+def load_cache(namespace: str, key, fingerprint=None, max_age: Optional[int] = None):
+
+    if not check_cache_dir():
+        return None
+
+    path = get_cache_path(namespace, key)
+
+    try:
+        if max_age is not None and time.time() - os.path.getmtime(path) > max_age:
+            os.remove(path)
+            return None
+
+        with open(path, "rb") as file:
+            entry = pickle.load(file)
+
+    except FileNotFoundError:
+        return None
+
+    except Exception as e:
+        print(f"Failed to read cache {path}: {e}")
+        return None
+
+    if entry["key"] != key or entry["fingerprint"] != fingerprint:
+        return None
+
+    return entry["value"]
+
+
+def save_cache(namespace: str, key, value, fingerprint=None) -> bool:
+
+    if not check_cache_dir():
+        return False
+
+    path = get_cache_path(namespace, key)
+    directory = os.path.dirname(path)
+
+    try:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+
+        try:
+            with os.fdopen(fd, "wb") as file:
+                pickle.dump(
+                    {"key": key, "fingerprint": fingerprint, "value": value}, file
+                )
+            os.replace(temp_path, path)
+
+        except Exception:
+            os.remove(temp_path)
+            raise
+
+        return True
+
+    except Exception as e:
+        print(f"Failed to write cache {path}: {e}")
+        return False
+
+
+def delete_cache(namespace: str, key) -> bool:
+
+    try:
+        os.remove(get_cache_path(namespace, key))
+        return True
+
+    except FileNotFoundError:
+        return False
@@ -0,0 +1,205 @@
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from pydantic import BaseModel, PrivateAttr
+
+from mongosequelizer.cache import load_cache, save_cache
+from mongosequelizer.type import JobStatus
+
+JOB_TTL_SECONDS = 86400
+
+
+class MigrationJob(BaseModel):
+    id: str
+    status: JobStatus = JobStatus.PENDING
+    tables: Dict[str, Dict[str, Any]] = {}
+    error: Optional[str] = None
+    created_at: float
+    finished_at: Optional[float] = None
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _cancelled: threading.Event = PrivateAttr(default_factory=threading.Event)
+
+    def save(cls):
+        save_cache("job", cls.id, cls.to_dict())
+
+    def to_dict(cls) -> dict:
+
+        with cls._lock:
+            return cls.model_dump(mode="json")
+
+    def set_status(cls, status: JobStatus, error: Optional[str] = None):
+
+        with cls._lock:
+            cls.status = status
+            cls.error = error
+
+            if status not in (JobStatus.PENDING, JobStatus.RUNNING):
+                cls.finished_at = time.time()
+
+        cls.save()
+
+    def start_table(cls, table: str, rows_total: Optional[int]):
+
+        with cls._lock:
+            cls.tables[table] = {
+                "status": JobStatus.RUNNING.value,
+                "rows_total": rows_total,
+                "rows_read": 0,
+                "rows_written": 0,
+                "rows_per_second": 0.0,
+                "eta_seconds": None,
+                "started_at": time.time(),
+            }
+
+        cls.save()
+
+    def update_table(cls, table: str, rows_read: int, rows_written: int):
+
+        with cls._lock:
+            progress = cls.tables[table]
+            progress["rows_read"] += rows_read
+            progress["rows_written"] += rows_written
+
+            elapsed = time.time() - progress["started_at"]
+            rows_per_second = progress["rows_read"] / elapsed if elapsed > 0 else 0.0
+            progress["rows_per_second"] = round(rows_per_second, 2)
+
+            if progress["rows_total"] is not None and rows_per_second > 0:
+                remaining = max(progress["rows_total"] - progress["rows_read"], 0)
+                progress["eta_seconds"] = round(remaining / rows_per_second, 2)
+
+        cls.save()
+
+    def finish_table(cls, table: str, status: JobStatus):
+
+        with cls._lock:
+            cls.tables[table]["status"] = status.value
+
+            if status == JobStatus.COMPLETED:
+                cls.tables[table]["eta_seconds"] = 0.0
+
+        cls.save()
+
+    def cancel(cls):
+
+        cls._cancelled.set()
+        save_cache("job-cancel", cls.id, True)
+
+    def is_cancelled(cls) -> bool:
+
+        if not cls._cancelled.is_set() and load_cache("job-cancel", cls.id):
+            cls._cancelled.set()
+
+        return cls._cancelled.is_set()
+
+
+_jobs: Dict[str, MigrationJob] = {}
+_jobs_lock = threading.Lock()
+
+
+def remove_finished_jobs():
+
+    now = time.time()
+
+    with _jobs_lock:
+        expired = [
+            job_id
+            for job_id, job in _jobs.items()
+            if job.finished_at is not None and now - job.finished_at > JOB_TTL_SECONDS
+        ]
+
+        for job_id in expired:
+            del _jobs[job_id]
+
+
+def create_job() -> MigrationJob:
+
+    remove_finished_jobs()
+
+    job = MigrationJob(id=uuid.uuid4().hex, created_at=time.time())
+
+    with _jobs_lock:
+        _jobs[job.id] = job
+
+    job.save()
+
+    return job
+
+
+def get_job(job_id: str) -> Optional[dict]:
+
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+
+    if job is not None:
+        return job.to_dict()
+
+    return load_cache("job", job_id, max_age=JOB_TTL_SECONDS)
+
+
+def cancel_job(job_id: str) -> bool:
+
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+
+    if job is not None:
+        if job.status in (JobStatus.PENDING, JobStatus.RUNNING):
+            job.cancel()
+            return True
+        return False
+
+    state = load_cache("job", job_id, max_age=JOB_TTL_SECONDS)
+
+    if state is None or state["status"] not in (
+        JobStatus.PENDING.value,
+        JobStatus.RUNNING.value,
+    ):
+        return False
+
+    return save_cache("job-cancel", job_id, True)
+
+
+def cancel_jobs():
+
+    with _jobs_lock:
+        jobs = list(_jobs.values())
+
+    for job in jobs:
+        if job.status in (JobStatus.PENDING, JobStatus.RUNNING):
+            job.cancel()
+
+
+def run_job(job: MigrationJob, task) -> bool:
+
+    if job.is_cancelled():
+        job.set_status(JobStatus.CANCELLED)
+        return False
+
+    job.set_status(JobStatus.RUNNING)
+
+    try:
+        success = task(job)
+
+    except Exception as e:
+        print(f"Job {job.id} failed: {e}")
+        job.set_status(JobStatus.FAILED, str(e))
+        return False
+
+    if job.is_cancelled():
+        job.set_status(JobStatus.CANCELLED)
+    elif success is True:
+        job.set_status(JobStatus.COMPLETED)
+    else:
+        job.set_status(JobStatus.FAILED)
+
+    return success
+
+
+def run_migration_job(job: MigrationJob, sequelizer) -> bool:
+    return run_job(job, sequelizer.migrate_data)
+
+
+def run_sync_job(job: MigrationJob, sequelizer) -> bool:
+    return run_job(job, sequelizer.sync_data)
@@ -8,3 +8,4 @@ class Field(BaseModel):
     data_type: MongoType
     not_null: bool
     unique: bool
+    confidence: float = 1.0
@@ -1,15 +1,40 @@
+import hashlib
 import itertools
-from typing import Dict
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
 
-from fuzzywuzzy import fuzz
-from pydantic import BaseModel
+import numpy as np
+from pydantic import BaseModel, PrivateAttr
 from pymongo import MongoClient
-from pymongo_schema.extract import extract_pymongo_client_schema
-
+from pymongo_schema.extract import (add_document_to_object_schema,
+                                    extract_pymongo_client_schema,
+                                    init_empty_object_schema,
+                                    post_process_schema,
+                                    recursive_default_to_regular_dict)
+from rapidfuzz import fuzz, process
+
+from mongosequelizer.cache import load_cache, save_cache
 from mongosequelizer.mongodb.cardinalities import Cardinalities
 from mongosequelizer.mongodb.collection import Collection
 from mongosequelizer.mongodb.field import Field
+from mongosequelizer.mongodb.snapshot import (MISSING, CollectionSnapshot,
+                                              count_metric, get_path_value)
 from mongosequelizer.type import CardinalitiesType, MongoType
+from mongosequelizer.utils import batched
+
+_clients: Dict[tuple, MongoClient] = {}
+_clients_lock = threading.Lock()
+
+
+def close_clients():
+
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+
+        _clients.clear()
 
 
 class MongoDB(BaseModel):
@@ -19,21 +44,54 @@ class MongoDB(BaseModel):
     username: str
     password: str
     collections: Dict = {}
+    batch_size: int = 1000
+    sample_size: Optional[int] = None
+    sample_ratio: Optional[float] = None
+    concurrency: int = 1
+    pool_size: int = 100
+    max_key_width: Optional[int] = 4
+    snapshot: bool = False
+    snapshot_memory_mb: int = 256
+    use_cache: bool = True
+    _primary_keys: Dict = PrivateAttr(default_factory=dict)
+    _candidate_keys: Dict = PrivateAttr(default_factory=dict)
+    _key_references: Dict = PrivateAttr(default_factory=dict)
+
+    def get_client_key(cls) -> tuple:
+
+        password = hashlib.sha256(cls.password.encode("utf-8")).hexdigest()
+
+        return (cls.host, cls.port, cls.username, password, cls.pool_size)
 
     def create_client(cls) -> MongoClient:
 
-        client = MongoClient(
-            host=cls.host,
-            port=cls.port,
-            username=cls.username,
-            password=cls.password,
-            serverSelectionTimeoutMS=5000,
-        )
+        key = cls.get_client_key()
+
+        with _clients_lock:
+            client = _clients.get(key)
+
+            if client is None:
+                client = MongoClient(
+                    host=cls.host,
+                    port=cls.port,
+                    username=cls.username,
+                    password=cls.password,
+                    serverSelectionTimeoutMS=5000,
+                    maxPoolSize=cls.pool_size,
+                )
+                _clients[key] = client
 
         return client
 
+    def close_client(cls):
+
+        with _clients_lock:
+            client = _clients.pop(cls.get_client_key(), None)
+
+        if client is not None:
+            client.close()
+
     def test_connection(cls) -> bool:
-        client = None
         try:
             client = cls.create_client()
             client.server_info()
@@ -41,14 +99,73 @@ class MongoDB(BaseModel):
 
         except Exception as e:
             print(e)
+            cls.close_client()
             return False
 
-        finally:
-            if client:
-                client.close()
+    def clear_cache(cls):
+
+        cls._primary_keys.clear()
+        cls._candidate_keys.clear()
+        cls._key_references.clear()
+
+    def get_cached(cls, cache: dict, key, compute):
+
+        if key not in cache:
+            cache[key] = compute()
+
+        return cache[key]
+
+    def get_cache_key(cls, *parts) -> tuple:
+        return (
+            cls.host,
+            cls.port,
+            cls.db,
+            cls.username,
+            cls.sample_size,
+            cls.sample_ratio,
+            cls.max_key_width,
+        ) + parts
+
+    def get_fingerprint(cls) -> dict:
+
+        client = cls.create_client()
+        db = client[cls.db]
+
+        fingerprint = {}
+
+        for coll_name in sorted(db.list_collection_names()):
+            stats = db.command("collStats", coll_name)
+            last = db[coll_name].find_one({}, {"_id": 1}, sort=[("_id", -1)])
+
+            fingerprint[coll_name] = (
+                stats.get("count"),
+                stats.get("size"),
+                None if last is None else last.get("_id"),
+            )
+
+        return fingerprint
+
+    def get_analysis_state(cls) -> dict:
+        return {
+            "collections": cls.collections,
+            "primary_keys": dict(cls._primary_keys),
+            "candidate_keys": dict(cls._candidate_keys),
+            "key_references": dict(cls._key_references),
+        }
+
+    def restore_analysis_state(cls, state: dict):
+
+        cls.clear_cache()
+
+        cls.collections = state["collections"]
+        cls._primary_keys.update(state["primary_keys"])
+        cls._candidate_keys.update(state["candidate_keys"])
+        cls._key_references.update(state["key_references"])
 
     def init_collection(cls):
 
+        cls.clear_cache()
+
         basic_schema = cls.generate_basic_schema()
 
         for coll in basic_schema.keys():
@@ -59,26 +176,192 @@ class MongoDB(BaseModel):
                     data_type=field["data_type"],
                     not_null=field["not_null"],
                     unique=field["unique"],
+                    confidence=field["confidence"],
                 )
 
                 collection.fields.append(field)
 
             cls.collections[coll] = collection.fields
 
-    def process_object(
-        cls, coll_name, object_data, parent_key="", result=None, final_schema=None
+    def get_sample_size(cls, collection) -> int:
+
+        total_documents = collection.estimated_document_count()
+
+        sample_size = 0
+        if cls.sample_size is not None:
+            sample_size = cls.sample_size
+        elif cls.sample_ratio is not None:
+            sample_size = math.ceil(total_documents * cls.sample_ratio)
+
+        if sample_size >= total_documents:
+            return 0
+
+        return max(sample_size, 0)
+
+    def extract_collection_schema(cls, client, coll_name: str):
+
+        collection = client[cls.db][coll_name]
+        sample_size = cls.get_sample_size(collection)
+
+        if not sample_size:
+            schema = extract_pymongo_client_schema(client, cls.db, coll_name)
+            return schema[cls.db][coll_name]["object"], None
+
+        collection_schema = {"count": 0, "object": init_empty_object_schema()}
+        sample = []
+
+        documents = collection.aggregate(
+            [{"$sample": {"size": sample_size}}], allowDiskUse=True
+        )
+
+        for document in documents:
+            add_document_to_object_schema(document, collection_schema["object"])
+            collection_schema["count"] += 1
+            sample.append(document)
+
+        post_process_schema(collection_schema)
+        collection_schema = recursive_default_to_regular_dict(collection_schema)
+
+        return collection_schema["object"], sample
+
+    def get_field_confidence(cls, count: int, sample) -> float:
+
+        if sample is None:
+            return 1.0
+
+        if count <= 3:
+            return 0.0
+
+        return round(1 - 3 / count, 4)
+
+    def profile_collection(
+        cls, coll_name, object_data, parent_key="", sample=None
     ) -> dict:
 
         client = cls.create_client()
         db = client[cls.db]
         collection = db[coll_name]
 
+        facets = {}
+        names = {}
+
+        def add_facet(metric, key, pipeline):
+            if (metric, key) not in names:
+                names[(metric, key)] = f"f{len(names)}"
+                facets[names[(metric, key)]] = pipeline
+
+        def collect(object_data, parent_key):
+
+            for key, value in object_data.items():
+
+                data_type = value["type"]
+
+                if data_type == "OBJECT":
+
+                    collect(value["object"], key)
+
+                    add_facet(
+                        "not_null",
+                        key,
+                        [{"$match": {f"{key}": {"$ne": None}}}, {"$count": "count"}],
+                    )
+                    add_facet(
+                        "unique",
+                        key,
+                        [{"$group": {"_id": f"${key}"}}, {"$count": "count"}],
+                    )
+
+                elif data_type == "ARRAY":
+
+                    if value["array_type"] == "OBJECT":
+                        collect(value["object"], key)
+
+                    add_facet(
+                        "array_size",
+                        key,
+                        [
+                            {
+                                "$project": {
+                                    "_id": 0,
+                                    "arraySize": {
+                                        "$size": {"$ifNull": [f"${key}", []]}
+                                    },
+                                }
+                            },
+                            {"$group": {"_id": None, "count": {"$sum": "$arraySize"}}},
+                        ],
+                    )
+                    add_facet(
+                        "array_unique",
+                        key,
+                        [
+                            {
+                                "$unwind": {
+                                    "path": f"${key}",
+                                    "preserveNullAndEmptyArrays": False,
+                                }
+                            },
+                            {"$project": {"_id": 0, f"{key}": 1}},
+                            {"$group": {"_id": f"${key}"}},
+                            {"$count": "count"},
+                        ],
+                    )
+
+                elif coll_name == parent_key:
+
+                    add_facet(
+                        "unique",
+                        key,
+                        [{"$group": {"_id": f"${key}"}}, {"$count": "count"}],
+                    )
+
+                else:
+
+                    add_facet(
+                        "parent_count",
+                        parent_key,
+                        [{"$unwind": f"${parent_key}"}, {"$count": "count"}],
+                    )
+                    add_facet("total", "", [{"$count": "count"}])
+
+        collect(object_data, parent_key)
+
+        profile = {}
+
+        if sample is not None:
+            for metric, key in names:
+                profile[(metric, key)] = count_metric(sample, metric, key)
+
+        elif facets:
+            pipeline = [{"$facet": facets}]
+
+            result = list(collection.aggregate(pipeline, allowDiskUse=True))[0]
+
+            for (metric, key), name in names.items():
+                profile[(metric, key)] = result[name][0]["count"] if result[name] else 0
+
+        return profile
+
+    def process_object(
+        cls,
+        coll_name,
+        object_data,
+        parent_key="",
+        result=None,
+        final_schema=None,
+        profile=None,
+        sample=None,
+    ) -> dict:
+
         if result is None:
             result = []
 
         if final_schema is None:
             final_schema = {}
 
+        if profile is None:
+            profile = cls.profile_collection(coll_name, object_data, parent_key, sample)
+
         for key, value in object_data.items():
 
             res = {}
@@ -93,26 +376,20 @@ class MongoDB(BaseModel):
                     parent_key=key,
                     result=[],
                     final_schema=final_schema,
+                    profile=profile,
+                    sample=sample,
                 )
 
                 final_schema[key] = nested_result
 
                 not_null = False
-                count = collection.aggregate(
-                    [{"$match": {f"{key}": {"$ne": None}}}, {"$count": "count"}]
-                )
-
-                count_values = list(count)[0]["count"]
+                count_values = profile[("not_null", key)]
 
                 if count_values == total_documents:
                     not_null = True
 
                 unique = False
-                unique_values = collection.aggregate(
-                    [{"$group": {"_id": f"${key}"}}, {"$count": "uniqueCount"}]
-                )
-
-                unique_count = list(unique_values)[0]["uniqueCount"]
+                unique_count = profile[("unique", key)]
                 uniqueness = unique_count / total_documents
 
                 if uniqueness == 1.0:
@@ -131,6 +408,8 @@ class MongoDB(BaseModel):
                     parent_key=key,
                     result=[],
                     final_schema=final_schema,
+                    profile=profile,
+                    sample=sample,
                 )
 
                 final_schema[key] = nested_result
@@ -141,34 +420,8 @@ class MongoDB(BaseModel):
 
                 unique = False
 
-                array_size_count = collection.aggregate(
-                    [
-                        {"$project": {"_id": 0, "arraySize": {"$size": f"${key}"}}},
-                        {
-                            "$group": {
-                                "_id": None,
-                                "totalArraySize": {"$sum": "$arraySize"},
-                            }
-                        },
-                    ]
-                )
-
-                total_array_document = collection.aggregate(
-                    [
-                        {
-                            "$unwind": {
-                                "path": f"${key}",
-                                "preserveNullAndEmptyArrays": False,
-                            }
-                        },
-                        {"$project": {"_id": 0, f"{key}": 1}},
-                        {"$group": {"_id": f"${key}"}},
-                        {"$count": "totalArrayDoc"},
-                    ]
-                )
-
-                array_size = list(array_size_count)[0]["totalArraySize"]
-                total_array = list(total_array_document)[0]["totalArrayDoc"]
+                array_size = profile[("array_size", key)]
+                total_array = profile[("array_unique", key)]
 
                 if array_size == total_array:
                     unique = True
@@ -182,39 +435,8 @@ class MongoDB(BaseModel):
 
                 unique = False
 
-                array_size_count = collection.aggregate(
-                    [
-                        {
-                            "$project": {
-                                "_id": 0,
-                                "arraySize": {"$size": {"$ifNull": [f"${key}", []]}},
-                            }
-                        },
-                        {
-                            "$group": {
-                                "_id": None,
-                                "totalArraySize": {"$sum": "$arraySize"},
-                            }
-                        },
-                    ]
-                )
-
-                total_array_document = collection.aggregate(
-                    [
-                        {
-                            "$unwind": {
-                                "path": f"${key}",
-                                "preserveNullAndEmptyArrays": False,
-                            }
-                        },
-                        {"$project": {"_id": 0, f"{key}": 1}},
-                        {"$group": {"_id": f"${key}"}},
-                        {"$count": "totalArrayDoc"},
-                    ]
-                )
-
-                array_size = list(array_size_count)[0]["totalArraySize"]
-                total_array = list(total_array_document)[0]["totalArrayDoc"]
+                array_size = profile[("array_size", key)]
+                total_array = profile[("array_unique", key)]
 
                 if array_size == total_array:
                     unique = True
@@ -234,21 +456,15 @@ class MongoDB(BaseModel):
                     if value["prop_in_object"] == 1.0:
                         not_null = True
                 else:
-                    pipeline = [{"$unwind": f"${parent_key}"}, {"$count": "count"}]
-                    count_values = collection.aggregate(pipeline)
-                    res_count = list(count_values)[0]["count"]
+                    res_count = profile[("parent_count", parent_key)]
                     if round(value["prop_in_object"], 2) == round(
-                        res_count / collection.count_documents({}), 2
+                        res_count / profile[("total", "")], 2
                     ):
                         not_null = True
 
                 unique = False
                 if coll_name == parent_key:
-                    unique_values = collection.aggregate(
-                        [{"$group": {"_id": f"${key}"}}, {"$count": "uniqueCount"}]
-                    )
-
-                    unique_count = list(unique_values)[0]["uniqueCount"]
+                    unique_count = profile[("unique", key)]
                     uniqueness = unique_count / total_documents
 
                     if uniqueness == 1.0:
@@ -259,9 +475,9 @@ class MongoDB(BaseModel):
                 res["not_null"] = not_null
                 res["unique"] = unique
 
-            result.append(res)
+            res["confidence"] = cls.get_field_confidence(total_documents, sample)
 
-        client.close()
+            result.append(res)
 
         return result
 
@@ -272,24 +488,122 @@ class MongoDB(BaseModel):
         collections = db.list_collection_names()
         final_schema = {}
 
-        for coll in collections:
-            schema = extract_pymongo_client_schema(client, cls.db, coll)
-            object_data = schema[cls.db][coll]["object"]
+        def process_collection_schema(coll):
+
+            collection_schema = {}
+
+            object_data, sample = cls.extract_collection_schema(client, coll)
 
-            processed_schema = cls.process_object(
+            collection_schema[coll] = cls.process_object(
                 coll_name=coll,
                 object_data=object_data,
                 parent_key=coll,
-                final_schema=final_schema,
+                final_schema=collection_schema,
+                sample=sample,
             )
 
-            final_schema[coll] = processed_schema
+            return collection_schema
 
-        client.close()
+        with ThreadPoolExecutor(max_workers=max(cls.concurrency, 1)) as executor:
+            for collection_schema in executor.map(
+                process_collection_schema, collections
+            ):
+                final_schema.update(collection_schema)
 
         return final_schema
 
+    def create_snapshot(
+        cls, coll_name: str, paths: Dict[str, str]
+    ) -> Optional[CollectionSnapshot]:
+
+        if cls.snapshot is False or len(paths) == 0:
+            return None
+
+        client = cls.create_client()
+        collection = client[cls.db][coll_name]
+
+        rows = collection.estimated_document_count()
+
+        if not CollectionSnapshot.fits_memory(rows, len(paths), cls.snapshot_memory_mb):
+            print(
+                f"Snapshot of {coll_name} exceeds {cls.snapshot_memory_mb} MB, querying MongoDB instead"
+            )
+            return None
+
+        projection = {"_id": 0}
+        for path in paths.values():
+            projection[path] = 1
+
+        documents = collection.find({}, projection, batch_size=cls.batch_size)
+
+        return CollectionSnapshot.from_documents(documents, paths)
+
+    def discover_minimal_keys(
+        cls, fields: list, total_documents: int, count_distinct
+    ) -> list:
+
+        candidate_key = []
+
+        max_width = len(fields)
+        if cls.max_key_width is not None:
+            max_width = min(cls.max_key_width, max_width)
+
+        if max_width < 2:
+            return candidate_key
+
+        single_counts = [count_distinct([field]) for field in fields]
+
+        level = {(i,): count for i, count in enumerate(single_counts)}
+
+        for width in range(2, max_width + 1):
+
+            next_level = {}
+            prev = sorted(level.keys())
+
+            for a, left in enumerate(prev):
+                for right in itertools.islice(prev, a + 1, None):
+
+                    if left[:-1] != right[:-1]:
+                        break
+
+                    comb = left + right[-1:]
+                    subsets = {i: tuple(k for k in comb if k != i) for i in comb}
+
+                    if not all(subset in level for subset in subsets.values()):
+                        continue
+
+                    upper_bound = min(
+                        level[subset] * single_counts[i]
+                        for i, subset in subsets.items()
+                    )
+
+                    if upper_bound < total_documents:
+                        next_level[comb] = upper_bound
+                        continue
+
+                    rem_fields = [fields[i] for i in comb]
+                    result = count_distinct(rem_fields)
+
+                    if result == total_documents:
+                        candidate_key.append(",".join(rem_fields))
+                    else:
+                        next_level[comb] = result
+
+            if not next_level:
+                break
+
+            level = next_level
+
+        return candidate_key
+
     def get_candidate_key(cls, coll_name: str) -> list:
+        return cls.get_cached(
+            cls._candidate_keys,
+            ("get_candidate_key", coll_name),
+            lambda: cls.find_candidate_key(coll_name),
+        )
+
+    def find_candidate_key(cls, coll_name: str) -> list:
 
         client = cls.create_client()
         db = client[cls.db]
@@ -307,34 +621,45 @@ class MongoDB(BaseModel):
             else:
                 temp_candidate_key.append(j.name)
 
+        snapshot = None
         if len(temp_candidate_key) > 1:
+            snapshot = cls.create_snapshot(
+                coll_name, {z: z for z in temp_candidate_key}
+            )
 
-            combinations = []
-            for r in range(2, len(temp_candidate_key) + 1):
-                combinations.extend(itertools.combinations(temp_candidate_key, r))
-
-            for comb in combinations:
-                rem_fields = list(comb)
+        def count_distinct(rem_fields: list) -> int:
 
-                inside_query = {}
-                for z in rem_fields:
-                    inside_query[z] = f"${z}"
+            if snapshot is not None:
+                return snapshot.count_distinct(rem_fields)
 
-                unique_values = collection.aggregate(
-                    [{"$group": {"_id": inside_query}}, {"$count": "uniqueCount"}]
-                )
+            inside_query = {}
+            for z in rem_fields:
+                inside_query[z] = f"${z}"
 
-                result = list(unique_values)[0]["uniqueCount"]
-                uniqueness = result / total_documents
+            unique_values = collection.aggregate(
+                [{"$group": {"_id": inside_query}}, {"$count": "uniqueCount"}],
+                allowDiskUse=True,
+            )
 
-                if uniqueness == 1.0:
-                    candidate_key.append(",".join(rem_fields))
+            return list(unique_values)[0]["uniqueCount"]
 
-        client.close()
+        if len(temp_candidate_key) > 1:
+            candidate_key.extend(
+                cls.discover_minimal_keys(
+                    temp_candidate_key, total_documents, count_distinct
+                )
+            )
 
         return candidate_key
 
     def get_candidate_key_embedded(cls, coll_name: str) -> list:
+        return cls.get_cached(
+            cls._candidate_keys,
+            ("get_candidate_key_embedded", coll_name),
+            lambda: cls.find_candidate_key_embedded(coll_name),
+        )
+
+    def find_candidate_key_embedded(cls, coll_name: str) -> list:
 
         client = cls.create_client()
         db = client[cls.db]
@@ -376,41 +701,53 @@ class MongoDB(BaseModel):
                 else:
                     temp_candidate_key.append(i.name)
 
-        if len(temp_candidate_key) > 0:
+        snapshot = None
+        if len(temp_candidate_key) > 1:
+            snapshot = cls.create_snapshot(
+                parent_list[0],
+                {z: f"{parent_coll}.{z}" for z in temp_candidate_key},
+            )
 
-            combinations = []
-            for r in range(2, len(temp_candidate_key) + 1):
-                combinations.extend(itertools.combinations(temp_candidate_key, r))
+        def count_distinct(rem_fields: list) -> int:
 
-            for comb in combinations:
-                rem_fields = list(comb)
+            if snapshot is not None:
+                return snapshot.count_distinct(rem_fields)
 
-                project_query = {}
-                project_query["_id"] = 0
-                group_query = {}
+            project_query = {}
+            project_query["_id"] = 0
+            group_query = {}
 
-                for z in rem_fields:
-                    project_query[z] = f"${parent_coll}.{z}"
-                    group_query[z] = f"${z}"
+            for z in rem_fields:
+                project_query[z] = f"${parent_coll}.{z}"
+                group_query[z] = f"${z}"
 
-                pipeline = [
-                    {"$project": project_query},
-                    {"$group": {"_id": group_query}},
-                    {"$count": "uniqueCount"},
-                ]
+            pipeline = [
+                {"$project": project_query},
+                {"$group": {"_id": group_query}},
+                {"$count": "uniqueCount"},
+            ]
 
-                unique_values = collection.aggregate(pipeline)
-                result = list(unique_values)[0]["uniqueCount"]
-                uniqueness = result / total_documents
+            unique_values = collection.aggregate(pipeline, allowDiskUse=True)
 
-                if uniqueness == 1.0:
-                    candidate_key.append(",".join(rem_fields))
+            return list(unique_values)[0]["uniqueCount"]
 
-        client.close()
+        if len(temp_candidate_key) > 0:
+            candidate_key.extend(
+                cls.discover_minimal_keys(
+                    temp_candidate_key, total_documents, count_distinct
+                )
+            )
 
         return candidate_key
 
     def get_candidate_key_array_embedded(cls, coll_name: str) -> list:
+        return cls.get_cached(
+            cls._candidate_keys,
+            ("get_candidate_key_array_embedded", coll_name),
+            lambda: cls.find_candidate_key_array_embedded(coll_name),
+        )
+
+    def find_candidate_key_array_embedded(cls, coll_name: str) -> list:
 
         client = cls.create_client()
         db = client[cls.db]
@@ -454,118 +791,174 @@ class MongoDB(BaseModel):
                 else:
                     temp_candidate_key.append(i.name)
 
+        def count_distinct(rem_fields: list) -> int:
+
+            project_query = {}
+            project_query["_id"] = 0
+            group_query = {}
+
+            for z in rem_fields:
+                project_query[z] = f"${parent_coll}.{z}"
+                group_query[z] = f"${z}"
+
+            pipeline = [
+                {"$unwind": f"${coll_name}"},
+                {"$group": {"_id": f"${coll_name}"}},
+                {"$project": project_query},
+                {"$group": {"_id": group_query}},
+                {"$count": "uniqueCount"},
+            ]
+
+            unique_values = collection.aggregate(pipeline, allowDiskUse=True)
+
+            return list(unique_values)[0]["uniqueCount"]
+
         if len(temp_candidate_key) > 0:
+            candidate_key.extend(
+                cls.discover_minimal_keys(
+                    temp_candidate_key, total_documents, count_distinct
+                )
+            )
 
-            combinations = []
-            for r in range(2, len(temp_candidate_key) + 1):
-                combinations.extend(itertools.combinations(temp_candidate_key, r))
+        return candidate_key
 
-            for comb in combinations:
-                rem_fields = list(comb)
+    def iter_distinct_values(cls, coll_name: str, key: str):
 
-                project_query = {}
-                project_query["_id"] = 0
-                group_query = {}
+        client = cls.create_client()
+        collection = client[cls.db][coll_name]
 
-                for z in rem_fields:
-                    project_query[z] = f"${parent_coll}.{z}"
-                    group_query[z] = f"${z}"
+        pipeline = [
+            {"$match": {key: {"$ne": None}}},
+            {"$project": {"_id": 0, "value": f"${key}"}},
+            {"$unwind": "$value"},
+            {"$group": {"_id": "$value"}},
+        ]
 
-                pipeline = [
-                    {"$unwind": f"${coll_name}"},
-                    {"$group": {"_id": f"${coll_name}"}},
-                    {"$project": project_query},
-                    {"$group": {"_id": group_query}},
-                    {"$count": "uniqueCount"},
-                ]
+        for doc in collection.aggregate(
+            pipeline, allowDiskUse=True, batchSize=cls.batch_size
+        ):
+            yield doc["_id"]
 
-                unique_values = collection.aggregate(pipeline)
-                result = list(unique_values)[0]["uniqueCount"]
-                uniqueness = result / total_documents
+    def check_values_in_field(cls, coll_name: str, field_name: str, values) -> bool:
 
-                if uniqueness == 1.0:
-                    candidate_key.append(",".join(rem_fields))
+        client = cls.create_client()
+        collection = client[cls.db][coll_name]
 
-        client.close()
+        contained = False
 
-        return candidate_key
+        for chunk in batched(values, cls.batch_size):
+            pipeline = [
+                {"$match": {field_name: {"$in": chunk}}},
+                {"$project": {"_id": 0, "value": f"${field_name}"}},
+                {"$unwind": "$value"},
+                {"$match": {"value": {"$in": chunk}}},
+                {"$group": {"_id": "$value"}},
+                {"$count": "matched"},
+            ]
+
+            result = list(collection.aggregate(pipeline, allowDiskUse=True))
+
+            if not result or result[0]["matched"] < len(chunk):
+                return False
+
+            contained = True
+
+        return contained
+
+    def get_key_name_candidates(
+        cls, src_key: str, src_coll: str, collections: list
+    ) -> list:
+
+        if src_key is None:
+            return []
+
+        candidates = [
+            (c, field.name) for c in collections for field in cls.collections[c]
+        ]
+
+        if not candidates:
+            return []
+
+        scores = process.cdist(
+            [src_coll + src_key],
+            [name for _, name in candidates],
+            scorer=fuzz.ratio,
+            dtype=np.float64,
+        )[0]
+
+        return [
+            candidate
+            for candidate, score in zip(candidates, scores)
+            if round(score) > 90
+        ]
 
     def check_key_in_other_collections(cls, src_key: str, src_coll: str) -> bool:
+        return cls.get_cached(
+            cls._key_references,
+            (src_key, src_coll, None),
+            lambda: cls.find_key_in_other_collections(src_key, src_coll),
+        )
+
+    def find_key_in_other_collections(cls, src_key: str, src_coll: str) -> bool:
 
         res = {}
 
         res["object"] = {}
         res["status"] = False
 
-        client = cls.create_client()
-        db = client[cls.db]
-
         collections = list(cls.collections.keys())
         collections.remove(src_coll)
 
-        source_coll = db[src_coll]
-
-        for c in collections:
-            fields = cls.collections[c]
-            for field in fields:
-                pipeline = [{"$project": {f"{src_key}": 1}}]
+        candidates = cls.get_key_name_candidates(src_key, src_coll, collections)
 
-                values = list(source_coll.aggregate(pipeline))
+        if not candidates:
+            return res
 
-                for v in values:
-                    target_coll = db[c]
-                    find = v[src_key]
-                    found = list(target_coll.find({f"{field.name}": find}))
+        for c, field_name in candidates:
+            values = cls.iter_distinct_values(c, field_name)
 
-                    if len(found) > 0:
-                        if fuzz.ratio(field.name, src_coll + src_key) > 90:
+            if cls.check_values_in_field(src_coll, src_key, values):
 
-                            res["object"][c] = {}
-                            res["object"][c]["collection"] = c
-                            res["object"][c]["field"] = field.name
-                            res["status"] = True
-
-                            break
-
-        client.close()
+                res["object"][c] = {}
+                res["object"][c]["collection"] = c
+                res["object"][c]["field"] = field_name
+                res["status"] = True
 
         return res
 
     def check_key_in_other_collection(
         cls, src_key: str, src_coll: str, src_dest: str
     ) -> bool:
+        return cls.get_cached(
+            cls._key_references,
+            (src_key, src_coll, src_dest),
+            lambda: cls.find_key_in_other_collection(src_key, src_coll, src_dest),
+        )
+
+    def find_key_in_other_collection(
+        cls, src_key: str, src_coll: str, src_dest: str
+    ) -> bool:
 
         res = {}
         res["collection"] = None
         res["field"] = None
         res["status"] = False
 
-        client = cls.create_client()
-        db = client[cls.db]
-
-        source_coll = db[src_coll]
-
-        fields = cls.collections[src_dest]
-        for field in fields:
-            pipeline = [{"$project": {f"{src_key}": 1}}]
-
-            values = list(source_coll.aggregate(pipeline))
+        candidates = cls.get_key_name_candidates(src_key, src_coll, [src_dest])
 
-            for v in values:
-                target_coll = db[src_dest]
-                find = v[src_key]
-                found = list(target_coll.find({f"{field.name}": find}))
+        if not candidates:
+            return res
 
-                if len(found) > 0:
-                    if fuzz.ratio(field.name, src_coll + src_key) > 90:
+        for c, field_name in candidates:
+            values = cls.iter_distinct_values(c, field_name)
 
-                        res["collection"] = src_dest
-                        res["field"] = field.name
-                        res["status"] = True
+            if cls.check_values_in_field(src_coll, src_key, values):
 
-                        return res
+                res["collection"] = c
+                res["field"] = field_name
+                res["status"] = True
 
-        client.close()
+                return res
 
         return res
 
@@ -653,6 +1046,11 @@ class MongoDB(BaseModel):
         return candidate_key[idx]
 
     def get_primary_key(cls, coll_name: str) -> str:
+        return cls.get_cached(
+            cls._primary_keys, coll_name, lambda: cls.find_primary_key(coll_name)
+        )
+
+    def find_primary_key(cls, coll_name: str) -> str:
 
         parent_coll = cls.check_embedding_collection(coll_name)
 
@@ -1112,18 +1510,48 @@ class MongoDB(BaseModel):
 
     def display_schema(cls):
 
+        if cls.use_cache is False:
+            return cls.generate_schema_summary()
+
+        key = cls.get_cache_key("schema")
+        fingerprint = cls.get_fingerprint()
+
+        summary = load_cache("schema", key, fingerprint)
+
+        if summary is None:
+            summary = cls.generate_schema_summary()
+            save_cache("schema", key, summary, fingerprint)
+
+        return summary
+
+    def generate_schema_summary(cls):
+
         client = cls.create_client()
         db = client[cls.db]
         collections = db.list_collection_names()
         final_schema = {}
+        confidence = {}
+        sampled = False
+
+        with ThreadPoolExecutor(max_workers=max(cls.concurrency, 1)) as executor:
+            extracted = list(
+                executor.map(
+                    lambda coll: cls.extract_collection_schema(client, coll),
+                    collections,
+                )
+            )
 
-        for coll in collections:
-            schema = extract_pymongo_client_schema(client, cls.db, coll)
-            object_data = schema[cls.db][coll]["object"]
+        for coll, (object_data, sample) in zip(collections, extracted):
 
             final_schema[coll] = object_data
 
-        client.close()
+            confidence[coll] = {
+                key: cls.get_field_confidence(value["count"], sample)
+                for key, value in object_data.items()
+            }
+
+            if sample is not None:
+                sampled = True
 
         summary = {}
 
@@ -1149,11 +1577,12 @@ class MongoDB(BaseModel):
                 else:
                     summary[coll][key] = value["type"]
 
+        if sampled:
+            return {"schema": summary, "confidence": confidence}
+
         return summary
 
-    def get_data_by_collection(
-        cls, relation: dict, cardinality_type: CardinalitiesType
-    ):
+    def get_data_pipeline(cls, relation: dict, cardinality_type: CardinalitiesType):
 
         client = cls.create_client()
         db = client[cls.db]
@@ -1176,8 +1605,6 @@ class MongoDB(BaseModel):
                 if i.name == coll_name:
                     coll_data_type = i.data_type
 
-        data = []
-
         if len(colls) > 1:
 
             coll_1 = colls[0]
@@ -1209,11 +1636,7 @@ class MongoDB(BaseModel):
                     {"$project": project_query},
                 ]
 
-                coll = db[coll_1]
-
-                docs = coll.aggregate(query)
-
-                data = list(docs)
+                return coll_1, query, None
 
             elif (
                 coll_2_parent_field[0] == coll_1
@@ -1235,7 +1658,7 @@ class MongoDB(BaseModel):
                 ]
 
                 coll = db[coll_1]
-                docs = coll.aggregate(query)
+                docs = coll.aggregate(query, allowDiskUse=True)
                 datas = list(docs)
                 value_id = {}
                 for i in range(0, len(datas)):
@@ -1256,23 +1679,18 @@ class MongoDB(BaseModel):
                     {"$project": project_query},
                 ]
 
-                coll = db[coll_1]
-
-                docs = coll.aggregate(query)
-
-                datas = list(docs)
-
-                data = []
+                def transform(datas):
+                    for d in datas:
+                        res = {}
+                        for f in fields:
+                            if f.split(".")[0] == coll_1:
+                                res[f.split(".")[-1]] = d[f.split(".")[-1]]
+                            else:
+                                res[f.split(".")[-1]] = value_id[d[f.split(".")[-1]]]
 
-                for d in datas:
-                    res = {}
-                    for f in fields:
-                        if f.split(".")[0] == coll_1:
-                            res[f.split(".")[-1]] = d[f.split(".")[-1]]
-                        else:
-                            res[f.split(".")[-1]] = value_id[d[f.split(".")[-1]]]
+                        yield res
 
-                    data.append(res)
+                return coll_1, query, transform
 
             elif (
                 coll_2_parent_coll == coll_1
@@ -1302,11 +1720,7 @@ class MongoDB(BaseModel):
                     {"$project": project_query},
                 ]
 
-                coll = db[coll_1]
-
-                docs = coll.aggregate(query)
-
-                data = list(docs)
+                return coll_1, query, None
 
             elif coll_2_parent_field[0] == coll_1 and coll_2 in cls.collections:
 
@@ -1330,11 +1744,7 @@ class MongoDB(BaseModel):
                     {"$project": project_query},
                 ]
 
-                coll = db[coll_1]
-
-                docs = coll.aggregate(query)
-
-                data = list(docs)
+                return coll_1, query, None
 
             elif coll_2_parent_field[0] == coll_1 and coll_2 not in cls.collections:
 
@@ -1352,7 +1762,7 @@ class MongoDB(BaseModel):
                 ]
 
                 coll = db[coll_1]
-                docs = coll.aggregate(query)
+                docs = coll.aggregate(query, allowDiskUse=True)
                 datas = list(docs)
                 value_id = {}
                 for i in range(0, len(datas)):
@@ -1373,23 +1783,18 @@ class MongoDB(BaseModel):
                     {"$project": project_query},
                 ]
 
-                coll = db[coll_1]
-
-                docs = coll.aggregate(query)
-
-                datas = list(docs)
-
-                data = []
+                def transform(datas):
+                    for d in datas:
+                        res = {}
+                        for f in fields:
+                            if f.split(".")[0] == coll_1:
+                                res[f.split(".")[-1]] = d[f.split(".")[-1]]
+                            else:
+                                res[f.split(".")[-1]] = value_id[d[f.split(".")[-1]]]
 
-                for d in datas:
-                    res = {}
-                    for f in fields:
-                        if f.split(".")[0] == coll_1:
-                            res[f.split(".")[-1]] = d[f.split(".")[-1]]
-                        else:
-                            res[f.split(".")[-1]] = value_id[d[f.split(".")[-1]]]
+                        yield res
 
-                    data.append(res)
+                return coll_1, query, transform
 
         else:
 
@@ -1411,11 +1816,7 @@ class MongoDB(BaseModel):
 
                         query = [{"$project": project_query}]
 
-                        coll = db[parent_coll]
-
-                        docs = coll.aggregate(query)
-
-                        data = list(docs)
+                        return parent_coll, query, None
 
                     elif cardinality_type is None:
 
@@ -1429,11 +1830,7 @@ class MongoDB(BaseModel):
                             {"$project": project_query},
                         ]
 
-                        coll = db[parent_coll]
-
-                        docs = coll.aggregate(query)
-
-                        data = list(docs)
+                        return parent_coll, query, None
 
                 elif (
                     coll_data_type is not None
@@ -1457,11 +1854,7 @@ class MongoDB(BaseModel):
                             {"$project": project_query},
                         ]
 
-                        coll = db[parent_coll]
-
-                        docs = coll.aggregate(query)
-
-                        data = list(docs)
+                        return parent_coll, query, None
 
                     elif cardinality_type == CardinalitiesType.MANY_TO_MANY:
 
@@ -1476,11 +1869,7 @@ class MongoDB(BaseModel):
                             {"$project": project_query},
                         ]
 
-                        coll = db[parent_coll]
-
-                        docs = coll.aggregate(query)
-
-                        data = list(docs)
+                        return parent_coll, query, None
 
             elif parent_field is not None and (
                 field_type == MongoType.ARRAY_OF_STRING
@@ -1532,11 +1921,7 @@ class MongoDB(BaseModel):
                         {"$project": project_query},
                     ]
 
-                    coll = db[parent_field]
-
-                    docs = coll.aggregate(pipeline)
-
-                    data = list(docs)
+                    return parent_field, pipeline, None
 
                 elif cardinality_type == CardinalitiesType.MANY_TO_MANY:
 
@@ -1551,11 +1936,7 @@ class MongoDB(BaseModel):
                             {"$project": project_query},
                         ]
 
-                        coll = db[coll_name]
-
-                        docs = coll.aggregate(query)
-
-                        data = list(docs)
+                        return coll_name, query, None
 
                     else:
 
@@ -1574,18 +1955,12 @@ class MongoDB(BaseModel):
                             {"$project": project_query},
                         ]
 
-                        coll = db[parent_field]
-
-                        docs = coll.aggregate(query)
-
-                        datas = list(docs)
+                        def transform(datas):
+                            for i, value in enumerate(datas):
+                                value["id"] = i + 1
+                                yield value
 
-                        data = []
-
-                        for i in range(0, len(datas)):
-                            value = datas[i]
-                            value["id"] = i + 1
-                            data.append(value)
+                        return parent_field, query, transform
 
                 else:
 
@@ -1600,11 +1975,7 @@ class MongoDB(BaseModel):
                             {"$project": project_query},
                         ]
 
-                        coll = db[coll_name]
-
-                        docs = coll.aggregate(query)
-
-                        data = list(docs)
+                        return coll_name, query, None
 
             else:
 
@@ -1625,11 +1996,7 @@ class MongoDB(BaseModel):
 
                     query = [{"$project": project_query}]
 
-                    coll = db[coll_name]
-
-                    docs = coll.aggregate(query)
-
-                    data = list(docs)
+                    return coll_name, query, None
 
                 else:
 
@@ -1642,10 +2009,158 @@ class MongoDB(BaseModel):
                         {"$project": project_query},
                     ]
 
-                    coll = db[coll_name]
+                    return coll_name, query, None
+
+        return None
+
+    def count_data_pipeline(cls, data_pipeline) -> int:
+
+        if data_pipeline is None:
+            return 0
+
+        coll_name, pipeline, _ = data_pipeline
+
+        client = cls.create_client()
+        collection = client[cls.db][coll_name]
+
+        if pipeline and "$match" in pipeline[0]:
+            return collection.count_documents(pipeline[0]["$match"])
+
+        return collection.estimated_document_count()
+
+    def get_max_value(cls, coll_name: str, field: str):
+
+        client = cls.create_client()
+
+        doc = client[cls.db][coll_name].find_one(
+            {field: {"$exists": True}}, {field: 1}, sort=[(field, -1)]
+        )
+
+        if doc is None:
+            return None
+
+        value = get_path_value(doc, field)
+
+        return None if value is MISSING else value
+
+    def filter_data_pipeline(cls, data_pipeline, match: dict):
+
+        if data_pipeline is None:
+            return None
+
+        coll_name, pipeline, transform = data_pipeline
+
+        return coll_name, [{"$match": match}] + pipeline, transform
+
+    def get_document_rows(cls, data_pipeline, documents: list) -> list:
+
+        if data_pipeline is None or not documents:
+            return []
+
+        _, pipeline, transform = data_pipeline
+
+        client = cls.create_client()
+
+        docs = client[cls.db].aggregate(
+            [{"$documents": documents}] + pipeline, allowDiskUse=True
+        )
+
+        if transform is not None:
+            docs = transform(docs)
+
+        return list(docs)
+
+    def enable_pre_images(cls, coll_names: list):
+
+        client = cls.create_client()
+        db = client[cls.db]
+
+        for coll_name in coll_names:
+            try:
+                db.command(
+                    "collMod",
+                    coll_name,
+                    changeStreamPreAndPostImages={"enabled": True},
+                )
+            except Exception as e:
+                print(f"Pre-images unavailable for {coll_name}: {e}")
+
+    def get_operation_time(cls):
+
+        client = cls.create_client()
+
+        return client.admin.command("ping").get("operationTime")
+
+    def watch_changes(
+        cls,
+        coll_names: list,
+        resume_token=None,
+        max_await_time_ms: int = 1000,
+        start_at_operation_time=None,
+        pre_images: bool = False,
+    ):
+
+        client = cls.create_client()
+
+        options = {}
+        if pre_images:
+            options["full_document_before_change"] = "whenAvailable"
+
+        return client[cls.db].watch(
+            [
+                {
+                    "$match": {
+                        "ns.coll": {"$in": coll_names},
+                        "operationType": {
+                            "$in": ["insert", "update", "replace", "delete"]
+                        },
+                    }
+                }
+            ],
+            resume_after=resume_token,
+            start_at_operation_time=start_at_operation_time,
+            max_await_time_ms=max_await_time_ms,
+            batch_size=cls.batch_size,
+            **options,
+        )
+
+    def get_ordered_pipeline(cls, pipeline: list) -> list:
+
+        ordered = [{"$sort": {"_id": 1}}]
+
+        for i, stage in enumerate(pipeline):
+            ordered.append(stage)
+
+            if "$group" in stage and (
+                i + 1 >= len(pipeline) or "$sort" not in pipeline[i + 1]
+            ):
+                ordered.append({"$sort": {"_id": 1}})
+
+        return ordered
+
+    def stream_data_pipeline(cls, data_pipeline, offset: int = 0, ordered=False):
+
+        if data_pipeline is None:
+            return
+
+        coll_name, pipeline, transform = data_pipeline
+
+        if ordered:
+            pipeline = cls.get_ordered_pipeline(pipeline)
+
+        if offset > 0 and transform is None:
+            pipeline = pipeline + [{"$skip": offset}]
+
+        client = cls.create_client()
+
+        docs = client[cls.db][coll_name].aggregate(
+            pipeline, batchSize=cls.batch_size, allowDiskUse=True
+        )
 
-                    docs = coll.aggregate(query)
+        if transform is not None:
+            docs = transform(docs)
 
-                    data = list(docs)
+            if offset > 0:
+                docs = itertools.islice(docs, offset, None)
 
-        return data
+        yield from docs
@@ -0,0 +1,146 @@
+import hashlib
+from array import array
+from datetime import datetime
+from typing import Dict
+
+import numpy as np
+from bson import ObjectId
+from bson.decimal128 import Decimal128
+from pydantic import BaseModel, ConfigDict
+
+MISSING = object()
+
+HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+
+def get_path_value(document, path: str):
+
+    value = document
+    for key in path.split("."):
+
+        if isinstance(value, list):
+            values = [
+                get_path_value(item, key)
+                for item in value
+                if isinstance(item, dict) and key in item
+            ]
+            value = [item for item in values if item is not MISSING]
+        elif isinstance(value, dict) and key in value:
+            value = value[key]
+        else:
+            return MISSING
+
+    return value
+
+
+def normalize_value(value):
+
+    if value is MISSING:
+        return ("missing",)
+    if value is None:
+        return ("null",)
+    if isinstance(value, bool):
+        return ("bool", value)
+    if isinstance(value, Decimal128):
+        value = float(value.to_decimal())
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if isinstance(value, (int, float)):
+        return ("number", value)
+    if isinstance(value, str):
+        return ("string", value)
+    if isinstance(value, ObjectId):
+        return ("objectid", str(value))
+    if isinstance(value, datetime):
+        return ("date", value.isoformat())
+    if isinstance(value, dict):
+        return ("object", tuple((k, normalize_value(v)) for k, v in value.items()))
+    if isinstance(value, list):
+        return ("array", tuple(normalize_value(v) for v in value))
+    return (type(value).__name__, repr(value))
+
+
+def hash_value(value) -> int:
+
+    digest = hashlib.blake2b(
+        repr(normalize_value(value)).encode("utf-8"), digest_size=8
+    ).digest()
+
+    return int.from_bytes(digest, "little")
+
+
+class CollectionSnapshot(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    rows: int
+    columns: Dict[str, np.ndarray]
+
+    @classmethod
+    def fits_memory(cls, rows: int, fields: int, memory_mb: int) -> bool:
+        return rows * fields * 8 <= memory_mb * 1024 * 1024
+
+    @classmethod
+    def from_documents(cls, documents, paths: Dict[str, str]):
+
+        values = {name: array("Q") for name in paths}
+
+        rows = 0
+        for document in documents:
+            for name, path in paths.items():
+                values[name].append(hash_value(get_path_value(document, path)))
+            rows += 1
+
+        columns = {
+            name: np.frombuffer(column, dtype=np.uint64)
+            for name, column in values.items()
+        }
+
+        return cls(rows=rows, columns=columns)
+
+    def combine(cls, fields: list) -> np.ndarray:
+
+        combined = cls.columns[fields[0]].copy()
+        for field in fields[1:]:
+            combined *= HASH_MULTIPLIER
+            combined ^= cls.columns[field]
+
+        return combined
+
+    def count_distinct(cls, fields: list) -> int:
+        return int(np.unique(cls.combine(fields)).size)
+
+
+def unwind_value(value) -> list:
+
+    if value is MISSING or value is None:
+        return []
+    if isinstance(value, list):
+        return value
+
+    return [value]
+
+
+def count_metric(documents: list, metric: str, key: str) -> int:
+
+    values = [get_path_value(document, key) for document in documents]
+
+    if metric == "not_null":
+        return sum(1 for value in values if value is not MISSING and value is not None)
+
+    if metric == "unique":
+        return len(
+            {normalize_value(None if value is MISSING else value) for value in values}
+        )
+
+    if metric == "array_size":
+        return sum(len(value) for value in values if isinstance(value, list))
+
+    if metric == "array_unique":
+        return len(
+            {normalize_value(item) for value in values for item in unwind_value(value)}
+        )
+
+    if metric == "parent_count":
+        return sum(len(unwind_value(value)) for value in values)
+
+    return len(documents)
@@ -1,23 +1,108 @@
-from datetime import datetime
+import os
+import tempfile
 from typing import Any, Dict, List
 
-from bson import ObjectId
-
 from mongosequelizer.mongodb.cardinalities import Cardinalities
 from mongosequelizer.mongodb.mongodb import MongoDB
 from mongosequelizer.mysql.attribute import Attribute
 from mongosequelizer.mysql.relation import AttributeObject, Relation
 from mongosequelizer.rdbms.rdbms import Rdbms
-from mongosequelizer.type import CardinalitiesType, MongoType, MySQLType
+from mongosequelizer.type import (CardinalitiesType, LoadMode, MongoType,
+                                  MySQLType)
+
+DUPLICATE_ENTRY = 1062
 
 
 class MySQL(Rdbms):
     engine: str = "mysql"
     relations: Dict[str, Any] = {"object": {}}
+    load_stats: Dict[str, Any] = {}
 
     def create_engine_url(cls) -> str:
         return f"mysql+pymysql://{cls.username}:{cls.password}@{cls.host}:{cls.port}/{cls.db}"
 
+    def get_connect_args(cls) -> dict:
+        if cls.load_mode == LoadMode.BULK:
+            return {"local_infile": True}
+        return {}
+
+    def quote_identifier(cls, name: str) -> str:
+        return f"`{name}`"
+
+    def get_current_schema(cls) -> str:
+        return "DATABASE()"
+
+    def encode_text_value(cls, value) -> str:
+        if isinstance(value, bool):
+            return "1" if value else "0"
+        return super().encode_text_value(value)
+
+    def load_data_rows(cls, cursor, table: str, columns: list, rows: list):
+
+        with tempfile.NamedTemporaryFile(
+            "w", suffix=".tsv", encoding="utf-8", newline="", delete=False
+        ) as file:
+            for row in rows:
+                file.write(cls.encode_text_row(row))
+
+        try:
+            load_query = (
+                f"LOAD DATA LOCAL INFILE '{file.name}' {'IGNORE ' if cls.incremental else ''}"
+                f"INTO TABLE {cls.quote_identifier(table)} "
+                "CHARACTER SET utf8mb4 "
+                "FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' "
+                "LINES TERMINATED BY '\\n' "
+                f"({', '.join(columns)})"
+            )
+
+            cursor.execute(load_query)
+        finally:
+            os.remove(file.name)
+
+        if cursor.warning_count:
+            cursor.execute("SHOW WARNINGS")
+
+            warnings = [
+                f"{code}: {message}"
+                for _, code, message in cursor.fetchall()
+                if not (cls.incremental and code == DUPLICATE_ENTRY)
+            ]
+
+            if warnings:
+                raise RuntimeError(
+                    f"LOAD DATA into {table} reported {len(warnings)} warnings: {'; '.join(warnings[:5])}"
+                )
+
+    def insert_rows(cls, cursor, table: str, columns: list, rows: list):
+
+        if cls.load_mode == LoadMode.BULK:
+            cls.load_data_rows(cursor, table, columns, rows)
+            return
+
+        if cls.incremental:
+            cls.upsert_rows(cursor, table, columns, rows, [])
+            return
+
+        super().insert_rows(cursor, table, columns, rows)
+
+    def upsert_rows(
+        cls, cursor, table: str, columns: list, rows: list, key_columns: list
+    ):
+
+        placeholders = ", ".join(["%s"] * len(columns))
+
+        update_columns = [column for column in columns if column not in key_columns]
+
+        if key_columns and update_columns:
+            insert_query = f"INSERT INTO {cls.quote_identifier(table)} ({', '.join(columns)}) VALUES ({placeholders}) ON DUPLICATE KEY UPDATE "
+            insert_query += ", ".join(
+                f"{column} = VALUES({column})" for column in update_columns
+            )
+        else:
+            insert_query = f"INSERT IGNORE INTO {cls.quote_identifier(table)} ({', '.join(columns)}) VALUES ({placeholders})"
+
+        cursor.executemany(insert_query, rows)
+
     def process_collection(cls, mongo: MongoDB, collections: dict):
 
         collection_names = list(collections.keys())
@@ -720,19 +805,17 @@ class MySQL(Rdbms):
 
         for table_name, table in schema.items():
             if table["foreign_key"]["object"] == {}:
-                ddl_statements.append(cls.create_table_ddl(table)[0])
-                foreign_key_statements.append(cls.create_table_ddl(table)[1])
+                ddl_statements.append(cls.create_table_ddl(table, schema)[0])
+                foreign_key_statements.append(cls.create_table_ddl(table, schema)[1])
             else:
-                ddl_statements.append(cls.create_table_ddl(table)[0])
-                foreign_key_statements.append(cls.create_table_ddl(table)[1])
+                ddl_statements.append(cls.create_table_ddl(table, schema)[0])
+                foreign_key_statements.append(cls.create_table_ddl(table, schema)[1])
 
         ddl_statements.extend(foreign_key_statements)
 
         return "\n\n".join(ddl_statements)
 
-    def create_table_ddl(cls, table: dict):
-
-        relations = cls.relations["object"]
+    def create_table_ddl(cls, table: dict, relations: dict, deferred: bool = False):
 
         ddl_create_table = f'CREATE TABLE `{table["name"]}` (\n'
 
@@ -742,7 +825,7 @@ class MySQL(Rdbms):
             column_line = f'    {table["attributes"]["object"][attr]["name"].split(".")[-1]} {table["attributes"]["object"][attr]["data_type"]}'
             if table["attributes"]["object"][attr]["not_null"]:
                 column_line += " NOT NULL"
-            if table["attributes"]["object"][attr]["unique"]:
+            if table["attributes"]["object"][attr]["unique"] and not deferred:
                 column_line += " UNIQUE"
             columns.append(column_line)
 
@@ -772,91 +855,3 @@ class MySQL(Rdbms):
                 ddl_alter_table += f'    FOREIGN KEY {fk["name"].split(".")[1]} REFERENCES `{fk["name"].split(".")[0]}`{key};'
 
         return ddl_create_table, ddl_alter_table
-
-    def insert_data_by_relation(
-        cls, mongodb: MongoDB, cardinalities: List[Cardinalities]
-    ):
-
-        schema = cls.relations["object"]
-
-        def find_dependencies(table_name):
-            dependencies = []
-            for table, data in schema.items():
-
-                for fk_keys in list(data["foreign_key"]["object"].keys()):
-                    fk = data["foreign_key"]["object"][fk_keys]
-                    if fk["name"].startswith(table_name):
-                        dependencies.append(table)
-            return dependencies
-
-        def get_table_creation_order():
-
-            all_tables = list(schema.keys())
-            creation_order = []
-
-            while all_tables:
-
-                for table in all_tables:
-
-                    dependencies = find_dependencies(table)
-                    if not dependencies or all(
-                        dep in creation_order for dep in dependencies
-                    ):
-                        creation_order.append(table)
-                        all_tables.remove(table)
-                        break
-
-            return creation_order[::-1]
-
-        def convert_to_timestamp(value):
-            if isinstance(value, datetime):
-                return str(datetime.fromtimestamp(value.timestamp()))
-            return value
-
-        creation_order = get_table_creation_order()
-
-        for i in creation_order:
-
-            relation = cls.relations["object"][i]
-            res = {}
-            res[relation["name"]] = {}
-
-            for att in list(relation["attributes"]["object"].keys()):
-                attr = relation["attributes"]["object"][att]
-                res[relation["name"]][f"{attr['name']}"] = f"${attr['name']}"
-
-            cardinality_type = None
-            for card in cardinalities:
-                if card.destination == relation["name"]:
-                    field = mongodb.get_field(relation["name"], card.source)
-                    if field:
-                        cardinality_type = card.type
-
-            datas = mongodb.get_data_by_collection(res, cardinality_type)
-
-            for data in datas:
-
-                transformed_data = {
-                    key: (
-                        str(value)
-                        if isinstance(value, ObjectId)
-                        else convert_to_timestamp(value)
-                    )
-                    for key, value in data.items()
-                }
-
-                columns = ", ".join(transformed_data.keys())
-                values = ", ".join(
-                    [
-                        f"'{value}'" if isinstance(value, str) else str(value)
-                        for value in transformed_data.values()
-                    ]
-                )
-
-                insert_query = (
-                    f"INSERT INTO `{relation['name']}` ({columns}) VALUES ({values});"
-                )
-
-                cls.execute_query(insert_query)
-
-        return True
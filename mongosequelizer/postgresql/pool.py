@@ -0,0 +1,63 @@
+import threading
+from typing import Dict
+
+from psycopg2.pool import PoolError, ThreadedConnectionPool
+
+
+class BlockingConnectionPool(ThreadedConnectionPool):
+    def __init__(self, minconn: int, maxconn: int, timeout: float, *args, **kwargs):
+        self._semaphore = threading.BoundedSemaphore(maxconn)
+        self.timeout = timeout
+        super().__init__(minconn, maxconn, *args, **kwargs)
+
+    def getconn(self, key=None):
+        if not self._semaphore.acquire(timeout=self.timeout):
+            raise PoolError(
+                f"no connection available within {self.timeout}s, pool of {self.maxconn} exhausted"
+            )
+        try:
+            connection = super().getconn(key)
+            if connection.closed:
+                super().putconn(connection, key, close=True)
+                connection = super().getconn(key)
+            return connection
+
+        except Exception:
+            self._semaphore.release()
+            raise
+
+    def putconn(self, conn=None, key=None, close=False):
+        try:
+            super().putconn(conn, key, close)
+        finally:
+            self._semaphore.release()
+
+
+_pools: Dict[tuple, BlockingConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(
+    url: str, minconn: int, maxconn: int, timeout: float, **kwargs
+) -> BlockingConnectionPool:
+
+    key = (url, minconn, maxconn, timeout)
+
+    with _pools_lock:
+        pool = _pools.get(key)
+
+        if pool is None or pool.closed:
+            pool = BlockingConnectionPool(minconn, maxconn, timeout, **kwargs)
+            _pools[key] = pool
+
+        return pool
+
+
+def close_pools():
+
+    with _pools_lock:
+        for pool in _pools.values():
+            if not pool.closed:
+                pool.closeall()
+
+        _pools.clear()
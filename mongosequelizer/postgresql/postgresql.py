@@ -1,29 +1,36 @@
+import io
 import logging
-from datetime import datetime
 from typing import Any, Dict, List
 
-import psycopg2
-from bson import ObjectId
 from psycopg2 import OperationalError
+from psycopg2.extras import execute_values
+from psycopg2.pool import PoolError
 
 from mongosequelizer.mongodb.cardinalities import Cardinalities
 from mongosequelizer.mongodb.mongodb import MongoDB
 from mongosequelizer.postgresql.attribute import Attribute
+from mongosequelizer.postgresql.pool import get_pool
 from mongosequelizer.postgresql.relation import AttributeObject, Relation
 from mongosequelizer.rdbms.rdbms import Rdbms
-from mongosequelizer.type import CardinalitiesType, MongoType, PsqlType
+from mongosequelizer.type import (CardinalitiesType, LoadMode, MongoType,
+                                  PsqlType)
 
 
 class PostgreSQL(Rdbms):
     engine: str = "postgresql"
     relations: Dict[str, Any] = {"object": {}}
+    load_stats: Dict[str, Any] = {}
 
     def create_engine_url(cls) -> str:
 
         return f"postgresql+psycopg2://{cls.username}:{cls.password}@{cls.host}:{cls.port}/{cls.db}"
 
-    def create_connection(cls):
-        connection = psycopg2.connect(
+    def create_pool(cls):
+        return get_pool(
+            cls.create_engine_url(),
+            cls.pool_min_size,
+            cls.pool_max_size,
+            cls.pool_timeout,
             host=cls.host,
             port=cls.port,
             database=cls.db,
@@ -31,7 +38,17 @@ class PostgreSQL(Rdbms):
             password=cls.password,
         )
 
-        return connection
+    def create_connection(cls):
+        return cls.create_pool().getconn()
+
+    def create_raw_connection(cls):
+        return cls.create_connection()
+
+    def release_connection(cls, connection):
+        cls.create_pool().putconn(connection)
+
+    def get_pool_size(cls) -> int:
+        return cls.create_pool().maxconn
 
     def test_connection(cls) -> bool:
         connection = None
@@ -40,15 +57,19 @@ class PostgreSQL(Rdbms):
             cursor = connection.cursor()
             cursor.execute("SELECT 1")
             cursor.close()
-            connection.close()
             return True
 
-        except OperationalError as e:
+        except (OperationalError, PoolError) as e:
             print(e)
             return False
 
+        finally:
+            if connection:
+                cls.release_connection(connection)
+
     def execute_query(cls, query: str) -> bool:
         logging.info(query)
+        conn = None
         try:
             conn = cls.create_connection()
             with conn.cursor() as cursor:
@@ -64,6 +85,52 @@ class PostgreSQL(Rdbms):
         except Exception as e:
             print(f"An error occurred: {e}")
             return False
+        finally:
+            if conn:
+                cls.release_connection(conn)
+
+    def copy_rows(cls, cursor, table: str, columns: list, rows: list):
+
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write(cls.encode_text_row(row))
+        buffer.seek(0)
+
+        copy_query = f"COPY {table} ({', '.join(columns)}) FROM STDIN"
+
+        cursor.copy_expert(copy_query, buffer)
+
+    def insert_rows(cls, cursor, table: str, columns: list, rows: list):
+
+        if cls.load_mode == LoadMode.BULK and not cls.incremental:
+            cls.copy_rows(cursor, table, columns, rows)
+            return
+
+        if cls.incremental:
+            cls.upsert_rows(cursor, table, columns, rows, [])
+            return
+
+        insert_query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES %s"
+
+        execute_values(cursor, insert_query, rows, page_size=cls.get_batch_size(table))
+
+    def upsert_rows(
+        cls, cursor, table: str, columns: list, rows: list, key_columns: list
+    ):
+
+        insert_query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES %s"
+
+        update_columns = [column for column in columns if column not in key_columns]
+
+        if key_columns and update_columns:
+            insert_query += f" ON CONFLICT ({', '.join(key_columns)}) DO UPDATE SET "
+            insert_query += ", ".join(
+                f"{column} = EXCLUDED.{column}" for column in update_columns
+            )
+        else:
+            insert_query += " ON CONFLICT DO NOTHING"
+
+        execute_values(cursor, insert_query, rows, page_size=cls.get_batch_size(table))
 
     def process_collection(cls, mongo: MongoDB, collections: dict):
 
@@ -755,19 +822,17 @@ class PostgreSQL(Rdbms):
 
         for table_name, table in schema.items():
             if table["foreign_key"]["object"] == {}:
-                ddl_statements.append(cls.create_table_ddl(table)[0])
-                foreign_key_statements.append(cls.create_table_ddl(table)[1])
+                ddl_statements.append(cls.create_table_ddl(table, schema)[0])
+                foreign_key_statements.append(cls.create_table_ddl(table, schema)[1])
             else:
-                ddl_statements.append(cls.create_table_ddl(table)[0])
-                foreign_key_statements.append(cls.create_table_ddl(table)[1])
+                ddl_statements.append(cls.create_table_ddl(table, schema)[0])
+                foreign_key_statements.append(cls.create_table_ddl(table, schema)[1])
 
         ddl_statements.extend(foreign_key_statements)
 
         return "\n\n".join(ddl_statements)
 
-    def create_table_ddl(cls, table: dict):
-
-        relations = cls.relations["object"]
+    def create_table_ddl(cls, table: dict, relations: dict, deferred: bool = False):
 
         ddl_create_table = f'CREATE TABLE {table["name"]} (\n'
 
@@ -777,7 +842,7 @@ class PostgreSQL(Rdbms):
             column_line = f'    {table["attributes"]["object"][attr]["name"].split(".")[-1]} {table["attributes"]["object"][attr]["data_type"]}'
             if table["attributes"]["object"][attr]["not_null"]:
                 column_line += " NOT NULL"
-            if table["attributes"]["object"][attr]["unique"]:
+            if table["attributes"]["object"][attr]["unique"] and not deferred:
                 column_line += " UNIQUE"
             columns.append(column_line)
 
@@ -807,91 +872,3 @@ class PostgreSQL(Rdbms):
                 ddl_alter_table += f'    FOREIGN KEY {fk["name"].split(".")[1]} REFERENCES {fk["name"].split(".")[0]}{key};'
 
         return ddl_create_table, ddl_alter_table
-
-    def insert_data_by_relation(
-        cls, mongodb: MongoDB, cardinalities: List[Cardinalities]
-    ):
-
-        schema = cls.relations["object"]
-
-        def find_dependencies(table_name):
-            dependencies = []
-            for table, data in schema.items():
-
-                for fk_keys in list(data["foreign_key"]["object"].keys()):
-                    fk = data["foreign_key"]["object"][fk_keys]
-                    if fk["name"].startswith(table_name):
-                        dependencies.append(table)
-            return dependencies
-
-        def get_table_creation_order():
-
-            all_tables = list(schema.keys())
-            creation_order = []
-
-            while all_tables:
-
-                for table in all_tables:
-
-                    dependencies = find_dependencies(table)
-                    if not dependencies or all(
-                        dep in creation_order for dep in dependencies
-                    ):
-                        creation_order.append(table)
-                        all_tables.remove(table)
-                        break
-
-            return creation_order[::-1]
-
-        def convert_to_timestamp(value):
-            if isinstance(value, datetime):
-                return str(datetime.fromtimestamp(value.timestamp()))
-            return value
-
-        creation_order = get_table_creation_order()
-
-        for i in creation_order:
-
-            relation = cls.relations["object"][i]
-            res = {}
-            res[relation["name"]] = {}
-
-            for att in list(relation["attributes"]["object"].keys()):
-                attr = relation["attributes"]["object"][att]
-                res[relation["name"]][f"{attr['name']}"] = f"${attr['name']}"
-
-            cardinality_type = None
-            for card in cardinalities:
-                if card.destination == relation["name"]:
-                    field = mongodb.get_field(relation["name"], card.source)
-                    if field:
-                        cardinality_type = card.type
-
-            datas = mongodb.get_data_by_collection(res, cardinality_type)
-
-            for data in datas:
-
-                transformed_data = {
-                    key: (
-                        str(value)
-                        if isinstance(value, ObjectId)
-                        else convert_to_timestamp(value)
-                    )
-                    for key, value in data.items()
-                }
-
-                columns = ", ".join(transformed_data.keys())
-                values = ", ".join(
-                    [
-                        f"'{value}'" if isinstance(value, str) else str(value)
-                        for value in transformed_data.values()
-                    ]
-                )
-
-                insert_query = (
-                    f"INSERT INTO {relation['name']} ({columns}) VALUES ({values});"
-                )
-
-                cls.execute_query(insert_query)
-
-        return True
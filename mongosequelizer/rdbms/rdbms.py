@@ -1,6 +1,37 @@
+import itertools
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from bson import ObjectId, Timestamp, json_util
 from pydantic import BaseModel
 from sqlalchemy import create_engine, text
-from sqlalchemy.exc import OperationalError
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError, TimeoutError
+
+from mongosequelizer.mongodb.cardinalities import Cardinalities
+from mongosequelizer.mongodb.mongodb import MongoDB
+from mongosequelizer.type import JobStatus, LoadMode
+from mongosequelizer.utils import batched
+
+CHECKPOINT_TABLE = "mongosequelizer_checkpoint"
+WATERMARK_TABLE = "mongosequelizer_watermark"
+SYNC_TABLE = "mongosequelizer_sync"
+
+_engines: Dict[tuple, Engine] = {}
+_engines_lock = threading.Lock()
+
+
+def dispose_engines():
+
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.dispose()
+
+        _engines.clear()
 
 
 class Rdbms(BaseModel):
@@ -9,21 +40,70 @@ class Rdbms(BaseModel):
     db: str
     username: str
     password: str
+    batch_size: int = 1000
+    batch_sizes: Dict[str, int] = {}
+    load_mode: LoadMode = LoadMode.INSERT
+    pool_min_size: int = 1
+    pool_max_size: int = 10
+    pool_timeout: float = 30
+    load_concurrency: int = 1
+    deferred_constraints: bool = False
+    checkpoint: bool = False
+    resume: bool = False
+    incremental: bool = False
+    watermark_field: str = "_id"
+    sync_batch_size: int = 1000
+    sync_interval_ms: int = 1000
+    sync_pre_images: bool = False
+    record_sync_start: bool = False
 
     def create_engine_url(cls) -> str:
         raise NotImplementedError("Subclasses should implement this method")
 
+    def get_connect_args(cls) -> dict:
+        return {}
+
     def create_connection(cls):
-        engine = create_engine(cls.create_engine_url())
+        url = cls.create_engine_url()
+        connect_args = cls.get_connect_args()
+
+        key = (
+            url,
+            cls.pool_min_size,
+            cls.pool_max_size,
+            cls.pool_timeout,
+            tuple(sorted(connect_args.items())),
+        )
+
+        with _engines_lock:
+            engine = _engines.get(key)
+
+            if engine is None:
+                engine = create_engine(
+                    url,
+                    pool_size=cls.pool_min_size,
+                    max_overflow=max(cls.pool_max_size - cls.pool_min_size, 0),
+                    pool_timeout=cls.pool_timeout,
+                    pool_pre_ping=True,
+                    connect_args=connect_args,
+                )
+                _engines[key] = engine
+
         return engine
 
+    def create_raw_connection(cls):
+        return cls.create_connection().raw_connection()
+
+    def release_connection(cls, connection):
+        connection.close()
+
     def test_connection(cls) -> bool:
         try:
             engine = cls.create_connection()
             with engine.connect() as connection:
                 connection.execute(text("SELECT 1"))
             return True
-        except OperationalError as e:
+        except (OperationalError, TimeoutError) as e:
             print(e)
             return False
 
@@ -40,3 +120,1051 @@ class Rdbms(BaseModel):
         except OperationalError as e:
             print(e)
             return False
+
+    def quote_identifier(cls, name: str) -> str:
+        return name
+
+    def convert_value(cls, value):
+        if isinstance(value, ObjectId):
+            return str(value)
+        if isinstance(value, datetime):
+            return str(datetime.fromtimestamp(value.timestamp()))
+        return value
+
+    def encode_text_value(cls, value) -> str:
+        if value is None:
+            return "\\N"
+        if isinstance(value, bool):
+            return "t" if value else "f"
+        return (
+            str(value)
+            .replace("\\", "\\\\")
+            .replace("\t", "\\t")
+            .replace("\n", "\\n")
+            .replace("\r", "\\r")
+        )
+
+    def encode_text_row(cls, row: tuple) -> str:
+        return "\t".join(cls.encode_text_value(value) for value in row) + "\n"
+
+    def get_batch_rows(cls, batch: list) -> Tuple[list, list]:
+
+        columns = []
+        for data in batch:
+            for key in data.keys():
+                if key not in columns:
+                    columns.append(key)
+
+        rows = [
+            tuple(cls.convert_value(data.get(column)) for column in columns)
+            for data in batch
+        ]
+
+        return columns, rows
+
+    def insert_rows(cls, cursor, table: str, columns: list, rows: list):
+
+        placeholders = ", ".join(["%s"] * len(columns))
+
+        insert_query = f"INSERT INTO {cls.quote_identifier(table)} ({', '.join(columns)}) VALUES ({placeholders})"
+
+        cursor.executemany(insert_query, rows)
+
+    def upsert_rows(
+        cls, cursor, table: str, columns: list, rows: list, key_columns: list
+    ):
+        raise NotImplementedError("Subclasses should implement this method")
+
+    def delete_rows(cls, cursor, table: str, columns: list, rows: list):
+
+        for row in rows:
+            conditions = " AND ".join(
+                f"{column} IS NULL" if value is None else f"{column} = %s"
+                for column, value in zip(columns, row)
+            )
+
+            cursor.execute(
+                f"DELETE FROM {cls.quote_identifier(table)} WHERE {conditions}",
+                tuple(value for value in row if value is not None),
+            )
+
+    def create_checkpoint_table(cls) -> bool:
+        return cls.execute_query(
+            f"CREATE TABLE IF NOT EXISTS {cls.quote_identifier(CHECKPOINT_TABLE)} ("
+            "table_name VARCHAR(255) NOT NULL PRIMARY KEY, "
+            "rows_done BIGINT NOT NULL, "
+            "completed BOOLEAN NOT NULL)"
+        )
+
+    def fetch_rows(cls, query: str, params: tuple = ()) -> list:
+
+        connection = cls.create_raw_connection()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(query, params)
+                rows = cursor.fetchall()
+            connection.commit()
+        finally:
+            cls.release_connection(connection)
+
+        return list(rows)
+
+    def get_checkpoints(cls) -> dict:
+
+        rows = cls.fetch_rows(
+            f"SELECT table_name, rows_done, completed FROM {cls.quote_identifier(CHECKPOINT_TABLE)}"
+        )
+
+        return {
+            table_name: {"rows_done": rows_done, "completed": bool(completed)}
+            for table_name, rows_done, completed in rows
+        }
+
+    def clear_checkpoints(cls) -> bool:
+        return cls.execute_query(
+            f"DELETE FROM {cls.quote_identifier(CHECKPOINT_TABLE)}"
+        )
+
+    def save_checkpoint(cls, cursor, table: str, rows_done: int, completed: bool):
+
+        checkpoint_table = cls.quote_identifier(CHECKPOINT_TABLE)
+
+        cursor.execute(
+            f"DELETE FROM {checkpoint_table} WHERE table_name = %s", (table,)
+        )
+        cursor.execute(
+            f"INSERT INTO {checkpoint_table} (table_name, rows_done, completed) VALUES (%s, %s, %s)",
+            (table, rows_done, completed),
+        )
+
+    def commit_checkpoint(cls, connection, table: str, rows_done: int, completed: bool):
+
+        with connection.cursor() as cursor:
+            cls.save_checkpoint(cursor, table, rows_done, completed)
+        connection.commit()
+
+    def create_watermark_table(cls) -> bool:
+        return cls.execute_query(
+            f"CREATE TABLE IF NOT EXISTS {cls.quote_identifier(WATERMARK_TABLE)} ("
+            "collection_name VARCHAR(255) NOT NULL, "
+            "field_name VARCHAR(255) NOT NULL, "
+            "watermark TEXT NOT NULL, "
+            "PRIMARY KEY (collection_name, field_name))"
+        )
+
+    def get_watermarks(cls) -> dict:
+
+        rows = cls.fetch_rows(
+            f"SELECT collection_name, watermark FROM {cls.quote_identifier(WATERMARK_TABLE)} "
+            "WHERE field_name = %s",
+            (cls.watermark_field,),
+        )
+
+        return {
+            collection_name: json_util.loads(watermark)
+            for collection_name, watermark in rows
+        }
+
+    def save_watermarks(cls, watermarks: dict):
+
+        watermark_table = cls.quote_identifier(WATERMARK_TABLE)
+
+        connection = cls.create_raw_connection()
+        try:
+            with connection.cursor() as cursor:
+                for collection_name, watermark in watermarks.items():
+                    cursor.execute(
+                        f"DELETE FROM {watermark_table} WHERE collection_name = %s AND field_name = %s",
+                        (collection_name, cls.watermark_field),
+                    )
+                    cursor.execute(
+                        f"INSERT INTO {watermark_table} (collection_name, field_name, watermark) VALUES (%s, %s, %s)",
+                        (
+                            collection_name,
+                            cls.watermark_field,
+                            json_util.dumps(watermark),
+                        ),
+                    )
+            connection.commit()
+        finally:
+            cls.release_connection(connection)
+
+    def create_sync_table(cls) -> bool:
+        return cls.execute_query(
+            f"CREATE TABLE IF NOT EXISTS {cls.quote_identifier(SYNC_TABLE)} ("
+            "stream_name VARCHAR(255) NOT NULL PRIMARY KEY, "
+            "resume_token TEXT NOT NULL)"
+        )
+
+    def get_sync_token(cls, stream_name: str):
+
+        rows = cls.fetch_rows(
+            f"SELECT resume_token FROM {cls.quote_identifier(SYNC_TABLE)} "
+            "WHERE stream_name = %s",
+            (stream_name,),
+        )
+
+        return json_util.loads(rows[0][0]) if rows else None
+
+    def save_sync_token(cls, cursor, stream_name: str, resume_token):
+
+        sync_table = cls.quote_identifier(SYNC_TABLE)
+
+        cursor.execute(
+            f"DELETE FROM {sync_table} WHERE stream_name = %s", (stream_name,)
+        )
+        cursor.execute(
+            f"INSERT INTO {sync_table} (stream_name, resume_token) VALUES (%s, %s)",
+            (stream_name, json_util.dumps(resume_token)),
+        )
+
+    def get_stream_name(cls, mongodb: MongoDB) -> str:
+        return f"{mongodb.host}:{mongodb.port}/{mongodb.db}"
+
+    def save_sync_start(cls, mongodb: MongoDB):
+
+        operation_time = mongodb.get_operation_time()
+
+        if operation_time is None:
+            return
+
+        stream_name = cls.get_stream_name(mongodb)
+
+        cls.create_sync_table()
+
+        if (cls.resume or cls.incremental) and cls.get_sync_token(
+            stream_name
+        ) is not None:
+            return
+
+        connection = cls.create_raw_connection()
+        try:
+            with connection.cursor() as cursor:
+                cls.save_sync_token(cursor, stream_name, operation_time)
+            connection.commit()
+        finally:
+            cls.release_connection(connection)
+
+    def insert_batch(
+        cls, connection, table: str, batch: list, checkpoint: Optional[int] = None
+    ) -> int:
+
+        columns, rows = cls.get_batch_rows(batch)
+
+        try:
+            with connection.cursor() as cursor:
+                cls.insert_rows(cursor, table, columns, rows)
+                if checkpoint is not None:
+                    cls.save_checkpoint(cursor, table, checkpoint + len(rows), False)
+            connection.commit()
+            return len(rows)
+
+        except Exception as e:
+            connection.rollback()
+            print(f"Batch insert into {table} failed, retrying row by row: {e}")
+
+        rows_written = 0
+        for i, row in enumerate(rows):
+            try:
+                with connection.cursor() as cursor:
+                    cls.insert_rows(cursor, table, columns, [row])
+                    if checkpoint is not None:
+                        cls.save_checkpoint(cursor, table, checkpoint + i + 1, False)
+                connection.commit()
+                rows_written += 1
+            except Exception as e:
+                connection.rollback()
+                print(f"An error occurred: {e}")
+
+        if checkpoint is not None:
+            cls.commit_checkpoint(connection, table, checkpoint + len(rows), False)
+
+        return rows_written
+
+    def get_batch_size(cls, table: str) -> int:
+        return cls.batch_sizes.get(table, cls.batch_size)
+
+    def load_relation(
+        cls, table: str, datas, job=None, checkpoint: Optional[int] = None
+    ) -> int:
+
+        rows_read = 0
+        rows_written = 0
+        cancelled = False
+        start = time.perf_counter()
+
+        connection = cls.create_raw_connection()
+        try:
+            for batch in batched(datas, cls.get_batch_size(table)):
+                if job is not None and job.is_cancelled():
+                    cancelled = True
+                    break
+
+                batch_written = cls.insert_batch(connection, table, batch, checkpoint)
+                rows_read += len(batch)
+                rows_written += batch_written
+
+                if checkpoint is not None:
+                    checkpoint += len(batch)
+
+                if job is not None:
+                    job.update_table(table, len(batch), batch_written)
+
+            if checkpoint is not None and not cancelled:
+                cls.commit_checkpoint(connection, table, checkpoint, True)
+        finally:
+            cls.release_connection(connection)
+
+        elapsed = time.perf_counter() - start
+        rows_per_second = rows_written / elapsed if elapsed > 0 else 0.0
+
+        cls.load_stats[table] = {
+            "rows_read": rows_read,
+            "rows": rows_written,
+            "seconds": round(elapsed, 3),
+            "rows_per_second": round(rows_per_second, 2),
+        }
+
+        print(
+            f"Loaded {rows_written} rows into {table} in {elapsed:.2f}s ({rows_per_second:.2f} rows/s)"
+        )
+
+        return rows_written
+
+    def create_unique_ddl(cls, table: dict) -> str:
+
+        ddl_unique = ""
+
+        for attr in table["attributes"]["object"].values():
+            if attr["unique"]:
+                column = attr["name"].split(".")[-1]
+                ddl_unique += f"\nALTER TABLE {cls.quote_identifier(table['name'])} ADD CONSTRAINT uq_{table['name']}_{column} UNIQUE ({column});"
+
+        return ddl_unique
+
+    def generate_table_ddl(cls, schema: dict) -> str:
+
+        ddl_statements = []
+
+        for table in schema.values():
+            ddl_statements.append(cls.create_table_ddl(table, schema, deferred=True)[0])
+
+        return "\n\n".join(ddl_statements)
+
+    def generate_foreign_key_ddl(cls, tables: dict, schema: dict) -> str:
+
+        ddl_statements = []
+
+        for table in tables.values():
+            ddl_alter_table = cls.create_table_ddl(table, schema, deferred=True)[1]
+            if ddl_alter_table != "":
+                ddl_statements.append(ddl_alter_table)
+
+        return "\n\n".join(ddl_statements)
+
+    def generate_constraint_ddl(cls, schema: dict) -> str:
+
+        ddl_statements = []
+
+        for table in schema.values():
+            ddl_unique = cls.create_unique_ddl(table)
+            if ddl_unique != "":
+                ddl_statements.append(ddl_unique)
+
+        ddl_foreign_key = cls.generate_foreign_key_ddl(schema, schema)
+        if ddl_foreign_key != "":
+            ddl_statements.append(ddl_foreign_key)
+
+        return "\n\n".join(ddl_statements)
+
+    def get_current_schema(cls) -> str:
+        return "current_schema()"
+
+    def get_constraint_names(cls) -> set:
+
+        rows = cls.fetch_rows(
+            "SELECT constraint_name FROM information_schema.table_constraints "
+            f"WHERE constraint_schema = {cls.get_current_schema()}"
+        )
+
+        return {constraint_name.lower() for constraint_name, in rows}
+
+    def execute_constraints(cls, ddl: str) -> bool:
+
+        if ddl == "":
+            return True
+
+        try:
+            existing = cls.get_constraint_names()
+
+            statements = []
+            for statement in ddl.split(";"):
+                match = re.search(r"ADD CONSTRAINT (\S+)", statement)
+
+                if match is not None:
+                    name = match[1].lower()
+                    if name in existing or name[:63] in existing:
+                        print(f"Skipping constraint {match[1]}, already exists")
+                        continue
+
+                if statement.strip():
+                    statements.append(statement)
+
+            if not statements:
+                return True
+
+            return cls.execute_query(";".join(statements) + ";")
+        except Exception as e:
+            print(f"Failed to add constraints: {e}")
+            return False
+
+    def add_constraints(cls, schema: dict) -> bool:
+        return cls.execute_constraints(cls.generate_constraint_ddl(schema))
+
+    def add_foreign_keys(cls, tables: dict, schema: dict) -> bool:
+        return cls.execute_constraints(cls.generate_foreign_key_ddl(tables, schema))
+
+    def get_dependency_graph(cls, schema: dict) -> Dict[str, Dict[str, list]]:
+
+        graph = {table: {} for table in schema}
+
+        for table, data in schema.items():
+            for fk_key, fk in data["foreign_key"]["object"].items():
+                referenced = fk["name"].split(".")[0]
+                if referenced in schema:
+                    graph[table].setdefault(referenced, []).append(fk_key)
+
+        return graph
+
+    def get_strong_components(cls, graph: dict, tables) -> List[List[str]]:
+
+        index = {}
+        low = {}
+        stack = []
+        on_stack = set()
+        components = []
+
+        for root in tables:
+            if root in index:
+                continue
+
+            index[root] = low[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+            work = [(root, iter(graph[root]))]
+
+            while work:
+                table, references = work[-1]
+
+                for referenced in references:
+                    if referenced not in tables:
+                        continue
+
+                    if referenced not in index:
+                        index[referenced] = low[referenced] = len(index)
+                        stack.append(referenced)
+                        on_stack.add(referenced)
+                        work.append((referenced, iter(graph[referenced])))
+                        break
+
+                    if referenced in on_stack:
+                        low[table] = min(low[table], index[referenced])
+
+                else:
+                    work.pop()
+
+                    if work:
+                        parent = work[-1][0]
+                        low[parent] = min(low[parent], low[table])
+
+                    if low[table] == index[table]:
+                        component = []
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            component.append(member)
+                            if member == table:
+                                break
+
+                        components.append(component)
+
+        return components
+
+    def find_blocking_cycle(cls, graph: dict, remaining: dict) -> List[str]:
+
+        for component in cls.get_strong_components(graph, remaining):
+            members = set(component)
+
+            if len(component) > 1 and all(
+                referenced in members or referenced not in remaining
+                for table in component
+                for referenced in graph[table]
+            ):
+                return component
+
+        return list(remaining)
+
+    def plan_table_levels(cls, schema: dict) -> Tuple[List[List[str]], Dict[str, list]]:
+
+        graph = cls.get_dependency_graph(schema)
+
+        dependents = {table: set() for table in schema}
+        in_degree = {table: 0 for table in schema}
+        deferred = {}
+
+        for table, references in graph.items():
+            for referenced, fk_keys in references.items():
+                if referenced == table:
+                    print(f"Foreign key cycle: {table} -> {table}")
+                    deferred.setdefault(table, []).extend(fk_keys)
+                    continue
+
+                dependents[referenced].add(table)
+                in_degree[table] += 1
+
+        order = {table: i for i, table in enumerate(schema)}
+        remaining = dict.fromkeys(schema)
+        table_levels = []
+        level = [table for table in schema if in_degree[table] == 0]
+
+        while remaining:
+
+            if not level:
+                component = cls.find_blocking_cycle(graph, remaining)
+                members = set(component)
+
+                table = min(component, key=lambda t: (in_degree[t], order[t]))
+                cycle = [r for r in graph[table] if r in members and r != table]
+
+                print(f"Foreign key cycle: {table} -> {', '.join(cycle)}")
+
+                for referenced in cycle:
+                    deferred.setdefault(table, []).extend(graph[table][referenced])
+                    dependents[referenced].discard(table)
+
+                in_degree[table] = 0
+                level = [table]
+
+            table_levels.append(level)
+
+            next_level = []
+            for table in level:
+                del remaining[table]
+
+                for dependent in dependents[table]:
+                    in_degree[dependent] -= 1
+                    if in_degree[dependent] == 0:
+                        next_level.append(dependent)
+
+            level = sorted(next_level, key=order.get)
+
+        return table_levels, deferred
+
+    def split_cyclic_foreign_keys(cls, schema: dict) -> Tuple[dict, dict]:
+
+        _, deferred = cls.plan_table_levels(schema)
+
+        immediate = {}
+        cyclic = {}
+
+        for name, table in schema.items():
+            foreign_keys = table["foreign_key"]["object"]
+            deferred_keys = deferred.get(name, [])
+
+            immediate[name] = dict(
+                table,
+                foreign_key={
+                    "object": {
+                        k: v for k, v in foreign_keys.items() if k not in deferred_keys
+                    }
+                },
+            )
+
+            if deferred_keys:
+                cyclic[name] = dict(
+                    table,
+                    foreign_key={"object": {k: foreign_keys[k] for k in deferred_keys}},
+                )
+
+        return immediate, cyclic
+
+    def build_relations(
+        cls, mongo: MongoDB, collections: dict, cardinalities: List[Cardinalities]
+    ) -> dict:
+
+        cls.relations = {"object": {}}
+
+        cls.process_mapping_cardinalities(mongo, collections, cardinalities)
+        cls.process_collection(mongo, collections)
+
+        return cls.relations["object"]
+
+    def get_pool_size(cls) -> int:
+
+        pool = cls.create_connection().pool
+
+        return pool.size() + max(pool._max_overflow, 0)
+
+    def get_load_concurrency(cls) -> int:
+
+        load_concurrency = max(cls.load_concurrency, 1)
+        pool_size = max(cls.get_pool_size(), 1)
+
+        if load_concurrency > pool_size:
+            print(
+                f"load_concurrency {load_concurrency} exceeds the connection pool size {pool_size}, loading {pool_size} tables at a time"
+            )
+            return pool_size
+
+        return load_concurrency
+
+    def get_relation_pipeline(
+        cls, mongodb: MongoDB, cardinalities: List[Cardinalities], relation: dict
+    ):
+
+        res = {}
+        res[relation["name"]] = {}
+
+        for att in list(relation["attributes"]["object"].keys()):
+            attr = relation["attributes"]["object"][att]
+            res[relation["name"]][f"{attr['name']}"] = f"${attr['name']}"
+
+        cardinality_type = None
+        for card in cardinalities:
+            if card.destination == relation["name"]:
+                field = mongodb.get_field(relation["name"], card.source)
+                if field:
+                    cardinality_type = card.type
+
+        return mongodb.get_data_pipeline(res, cardinality_type)
+
+    def insert_data_by_relation(
+        cls,
+        mongodb: MongoDB,
+        cardinalities: List[Cardinalities],
+        schema: dict = None,
+        job=None,
+    ):
+
+        if schema is None:
+            schema = cls.relations["object"]
+
+        checkpoints = None
+        if cls.checkpoint or cls.resume:
+            cls.create_checkpoint_table()
+
+            if cls.resume:
+                checkpoints = cls.get_checkpoints()
+            else:
+                cls.clear_checkpoints()
+                checkpoints = {}
+
+        pipelines = {}
+        watermarks = {}
+        high_watermarks = {}
+        watermarks_lock = threading.Lock()
+        rejected = []
+        if cls.incremental:
+            pipelines = {
+                name: cls.get_relation_pipeline(mongodb, cardinalities, relation)
+                for name, relation in schema.items()
+            }
+
+            generated = [
+                name
+                for name, data_pipeline in pipelines.items()
+                if data_pipeline is not None and data_pipeline[2] is not None
+            ]
+            if generated:
+                print(
+                    f"Incremental load is not supported for {', '.join(generated)}, their ids are generated on every load"
+                )
+                return False
+
+            cls.create_watermark_table()
+            watermarks = cls.get_watermarks()
+
+        def get_high_watermark(coll_name: str):
+
+            with watermarks_lock:
+                if coll_name not in high_watermarks:
+                    high_watermarks[coll_name] = mongodb.get_max_value(
+                        coll_name, cls.watermark_field
+                    )
+
+                return high_watermarks[coll_name]
+
+        def load_table(i) -> bool:
+
+            relation = schema[i]
+
+            offset = None
+            if checkpoints is not None:
+                state = checkpoints.get(relation["name"], {})
+
+                if state.get("completed"):
+                    print(f"Skipping {relation['name']}, already loaded")
+                    return True
+
+                offset = state.get("rows_done", 0)
+
+            if job is not None and job.is_cancelled():
+                return False
+
+            if i in pipelines:
+                data_pipeline = pipelines[i]
+            else:
+                data_pipeline = cls.get_relation_pipeline(
+                    mongodb, cardinalities, relation
+                )
+
+            if data_pipeline is not None:
+                coll_name = data_pipeline[0]
+                low = watermarks.get(coll_name)
+                high = get_high_watermark(coll_name)
+
+                bounds = None
+                if low is not None:
+                    bounds = {"$gt": low}
+                    if high is not None:
+                        bounds["$lte"] = high
+                elif high is not None:
+                    bounds = {"$not": {"$gt": high}}
+
+                if bounds is not None:
+                    data_pipeline = mongodb.filter_data_pipeline(
+                        data_pipeline, {cls.watermark_field: bounds}
+                    )
+
+            datas = mongodb.stream_data_pipeline(
+                data_pipeline, offset or 0, ordered=checkpoints is not None
+            )
+
+            if job is not None:
+                rows_total = mongodb.count_data_pipeline(data_pipeline)
+                job.start_table(relation["name"], max(rows_total - (offset or 0), 0))
+
+            rows_written = cls.load_relation(relation["name"], datas, job, offset)
+            rows_read = cls.load_stats[relation["name"]]["rows_read"]
+
+            if job is not None and job.is_cancelled():
+                job.finish_table(relation["name"], JobStatus.CANCELLED)
+                return False
+
+            if rows_written < rows_read:
+                rejected.append(relation["name"])
+                print(
+                    f"{rows_read - rows_written} rows were rejected by {relation['name']}"
+                )
+
+                if cls.incremental:
+                    if job is not None:
+                        job.finish_table(relation["name"], JobStatus.FAILED)
+                    return False
+
+            if job is not None:
+                job.finish_table(relation["name"], JobStatus.COMPLETED)
+
+            return True
+
+        if cls.record_sync_start:
+            cls.save_sync_start(mongodb)
+
+        table_levels, _ = cls.plan_table_levels(schema)
+
+        with ThreadPoolExecutor(max_workers=cls.get_load_concurrency()) as executor:
+            for level in table_levels:
+                if not all(list(executor.map(load_table, level))):
+                    return False
+
+        if rejected:
+            print(
+                f"Not recording watermarks, rows were rejected by {', '.join(rejected)}"
+            )
+            return True
+
+        if not cls.incremental:
+            cls.create_watermark_table()
+
+        cls.save_watermarks({k: v for k, v in high_watermarks.items() if v is not None})
+
+        return True
+
+    def get_key_columns(cls, relation: dict, batch: list) -> list:
+
+        primary_key = relation.get("primary_key")
+
+        if not primary_key or not batch:
+            return []
+
+        column = primary_key["name"].split(".")[-1]
+
+        return [column] if all(column in data for data in batch) else []
+
+    def is_shared_pipeline(cls, pipeline: list) -> bool:
+
+        for stage in pipeline:
+            if "$group" not in stage:
+                continue
+
+            group_key = stage["$group"]["_id"]
+
+            if isinstance(group_key, dict):
+                if "$_id" not in group_key.values():
+                    return True
+            elif group_key != "$_id":
+                return True
+
+        return False
+
+    def get_source_column(cls, pipeline: list):
+
+        source = "$_id"
+
+        for stage in pipeline:
+            if "$group" in stage:
+                group_key = stage["$group"]["_id"]
+
+                if isinstance(group_key, dict):
+                    fields = [k for k, v in group_key.items() if v == source]
+                    source = f"$_id.{fields[0]}" if fields else None
+                elif group_key != source:
+                    source = None
+
+            elif "$project" in stage:
+                projection = stage["$project"]
+                columns = [k for k, v in projection.items() if v == source]
+
+                if columns:
+                    source = f"${columns[0]}"
+                elif source != "$_id" or "_id" in projection:
+                    source = None
+
+            if source is None:
+                return None
+
+        return source[1:] if "." not in source else None
+
+    def apply_changes(
+        cls,
+        mongodb: MongoDB,
+        schema: dict,
+        pipelines: dict,
+        events: list,
+        stream_name: str,
+        job=None,
+    ) -> bool:
+
+        changes = {}
+        for event in events:
+            coll_name = event["ns"]["coll"]
+            doc_id = event["documentKey"]["_id"]
+            key = json_util.dumps(doc_id)
+
+            entry = changes.setdefault(coll_name, {"ids": {}, "before": {}})
+            entry["ids"].setdefault(key, doc_id)
+
+            if cls.sync_pre_images and key not in entry["before"]:
+                before = event.get("fullDocumentBeforeChange")
+
+                if before is None and event["operationType"] != "insert":
+                    print(
+                        f"No pre-image for {coll_name} {doc_id}, stale rows may remain"
+                    )
+
+                entry["before"][key] = before
+
+        upserts = {}
+        deletes = {}
+
+        for table, data_pipeline in pipelines.items():
+            entry = changes.get(data_pipeline[0])
+
+            if entry is None:
+                continue
+
+            doc_ids = list(entry["ids"].values())
+
+            new_batch = list(
+                mongodb.stream_data_pipeline(
+                    mongodb.filter_data_pipeline(
+                        data_pipeline, {"_id": {"$in": doc_ids}}
+                    )
+                )
+            )
+
+            source_column = cls.get_source_column(data_pipeline[1])
+
+            if source_column is not None:
+                key_columns = cls.get_key_columns(schema[table], new_batch)
+                columns, rows = cls.get_batch_rows(new_batch)
+
+                kept = set()
+                if key_columns == [source_column]:
+                    position = columns.index(source_column)
+                    kept = {row[position] for row in rows}
+
+                upserts[table] = (columns, rows, key_columns)
+                deletes[table] = (
+                    [source_column],
+                    [
+                        (cls.convert_value(doc_id),)
+                        for doc_id in doc_ids
+                        if cls.convert_value(doc_id) not in kept
+                    ],
+                )
+                continue
+
+            old_batch = []
+            if not cls.is_shared_pipeline(data_pipeline[1]):
+                old_batch = mongodb.get_document_rows(
+                    data_pipeline,
+                    [
+                        before
+                        for before in entry["before"].values()
+                        if before is not None
+                    ],
+                )
+
+            if not new_batch and not old_batch:
+                continue
+
+            key_columns = cls.get_key_columns(schema[table], new_batch + old_batch)
+            columns, rows = cls.get_batch_rows(new_batch + old_batch)
+
+            positions = [columns.index(column) for column in key_columns] or list(
+                range(len(columns))
+            )
+
+            new_rows = {}
+            for row in itertools.islice(rows, len(new_batch)):
+                new_rows[tuple(row[p] for p in positions)] = row
+
+            old_keys = {}
+            for row in itertools.islice(rows, len(new_batch), None):
+                row_key = tuple(row[p] for p in positions)
+                if row_key not in new_rows:
+                    old_keys[row_key] = None
+
+            upserts[table] = (columns, list(new_rows.values()), key_columns)
+            deletes[table] = ([columns[p] for p in positions], list(old_keys))
+
+        connection = cls.create_raw_connection()
+        try:
+            with connection.cursor() as cursor:
+                for table in reversed(list(deletes)):
+                    delete_columns, old_keys = deletes[table]
+                    if old_keys:
+                        cls.delete_rows(cursor, table, delete_columns, old_keys)
+
+                for table, (columns, rows, key_columns) in upserts.items():
+                    if rows:
+                        cls.upsert_rows(cursor, table, columns, rows, key_columns)
+
+                cls.save_sync_token(cursor, stream_name, events[-1]["_id"])
+            connection.commit()
+
+        except Exception as e:
+            connection.rollback()
+            print(f"Failed to apply changes: {e}")
+            return False
+
+        finally:
+            cls.release_connection(connection)
+
+        print(f"Applied {len(events)} changes from {', '.join(changes)}")
+
+        if job is not None:
+            for table, (_, rows, _) in upserts.items():
+                rows_changed = len(rows) + len(deletes[table][1])
+
+                if table not in job.tables:
+                    job.start_table(table, None)
+
+                job.update_table(table, rows_changed, rows_changed)
+
+        return True
+
+    def sync_changes(
+        cls,
+        mongodb: MongoDB,
+        cardinalities: List[Cardinalities],
+        schema: dict = None,
+        job=None,
+    ) -> bool:
+
+        if schema is None:
+            schema = cls.relations["object"]
+
+        table_levels, _ = cls.plan_table_levels(schema)
+
+        pipelines = {}
+        for level in table_levels:
+            for table in level:
+                data_pipeline = cls.get_relation_pipeline(
+                    mongodb, cardinalities, schema[table]
+                )
+
+                if data_pipeline is None:
+                    continue
+
+                if data_pipeline[2] is not None:
+                    print(f"Skipping {table}, generated ids cannot be synced")
+                    continue
+
+                if (
+                    cls.get_source_column(data_pipeline[1]) is None
+                    and not cls.is_shared_pipeline(data_pipeline[1])
+                    and not cls.sync_pre_images
+                ):
+                    print(
+                        f"Cannot sync {table}, its rows do not keep the source _id "
+                        "and sync_pre_images is disabled"
+                    )
+                    return False
+
+                pipelines[table] = data_pipeline
+
+        coll_names = sorted({data_pipeline[0] for data_pipeline in pipelines.values()})
+        stream_name = cls.get_stream_name(mongodb)
+
+        cls.create_sync_table()
+
+        if cls.sync_pre_images:
+            mongodb.enable_pre_images(coll_names)
+
+        resume_token = cls.get_sync_token(stream_name)
+
+        start_at = None
+        if isinstance(resume_token, Timestamp):
+            start_at, resume_token = resume_token, None
+        elif resume_token is None:
+            print(f"No sync start recorded for {stream_name}, streaming from now")
+
+        with mongodb.watch_changes(
+            coll_names,
+            resume_token,
+            cls.sync_interval_ms,
+            start_at,
+            cls.sync_pre_images,
+        ) as stream:
+
+            while job is None or not job.is_cancelled():
+
+                if not stream.alive:
+                    print(f"Change stream on {stream_name} closed")
+                    return False
+
+                events = []
+                while len(events) < cls.sync_batch_size:
+                    event = stream.try_next()
+                    if event is None:
+                        break
+                    events.append(event)
+
+                if events and not cls.apply_changes(
+                    mongodb, schema, pipelines, events, stream_name, job
+                ):
+                    return False
+
+        return True
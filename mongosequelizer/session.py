@@ -0,0 +1,126 @@
+import os
+import threading
+import time
+import uuid
+from typing import Dict, Optional, Tuple
+
+from pydantic import BaseModel
+
+from mongosequelizer.cache import (delete_cache, get_cache_path, load_cache,
+                                   save_cache)
+from mongosequelizer.mongodb.mongodb import MongoDB
+from mongosequelizer.rdbms.rdbms import Rdbms
+from mongosequelizer.transformator import MongoSequelizer
+
+SESSION_TTL_SECONDS = 3600
+
+
+class SessionCredentials(BaseModel):
+    rdbms_password: Optional[str] = None
+    mongodb_password: Optional[str] = None
+
+
+_sessions: Dict[str, Tuple[float, MongoSequelizer]] = {}
+_sessions_lock = threading.Lock()
+
+
+def remove_expired_sessions():
+
+    now = time.monotonic()
+
+    with _sessions_lock:
+        expired = [
+            session_id
+            for session_id, (last_used, _) in _sessions.items()
+            if now - last_used > SESSION_TTL_SECONDS
+        ]
+
+        for session_id in expired:
+            del _sessions[session_id]
+
+
+def touch_session_file(session_id: str):
+
+    try:
+        os.utime(get_cache_path("session", session_id))
+    except OSError:
+        pass
+
+
+def load_session(
+    session_id: str, credentials: Optional[SessionCredentials] = None
+) -> Optional[MongoSequelizer]:
+
+    config = load_cache("session", session_id, max_age=SESSION_TTL_SECONDS)
+
+    if config is None:
+        return None
+
+    if credentials is None:
+        credentials = SessionCredentials()
+
+    sequelizer = MongoSequelizer(
+        config["rdbms_type"],
+        Rdbms(**config["rdbms"], password=credentials.rdbms_password or ""),
+        MongoDB(**config["mongodb"], password=credentials.mongodb_password or ""),
+    )
+
+    return sequelizer.restore_analysis(config["analysis"])
+
+
+def create_session(sequelizer: MongoSequelizer) -> str:
+
+    remove_expired_sessions()
+
+    session_id = uuid.uuid4().hex
+
+    with _sessions_lock:
+        _sessions[session_id] = (time.monotonic(), sequelizer)
+
+    save_cache(
+        "session",
+        session_id,
+        {
+            "rdbms_type": sequelizer.rdbms_type,
+            "rdbms": sequelizer.rdbms.model_dump(exclude={"password"}),
+            "mongodb": sequelizer.mongodb.model_dump(
+                exclude={"collections", "password"}
+            ),
+            "analysis": sequelizer.get_analysis(),
+        },
+    )
+
+    return session_id
+
+
+def get_session(
+    session_id: str, credentials: Optional[SessionCredentials] = None
+) -> Optional[MongoSequelizer]:
+
+    remove_expired_sessions()
+
+    with _sessions_lock:
+        session = _sessions.get(session_id)
+
+    if session is None:
+        sequelizer = load_session(session_id, credentials)
+
+        if sequelizer is None:
+            return None
+
+    else:
+        sequelizer = session[1]
+        touch_session_file(session_id)
+
+    with _sessions_lock:
+        _sessions[session_id] = (time.monotonic(), sequelizer)
+
+    return sequelizer
+
+
+def delete_session(session_id: str) -> bool:
+
+    with _sessions_lock:
+        deleted = _sessions.pop(session_id, None) is not None
+
+    return delete_cache("session", session_id) or deleted
@@ -1,3 +1,4 @@
+from mongosequelizer.cache import load_cache, save_cache
 from mongosequelizer.mongodb.mongodb import MongoDB
 from mongosequelizer.mysql.mysql import MySQL
 from mongosequelizer.postgresql.postgresql import PostgreSQL
@@ -9,132 +10,138 @@ class MongoSequelizer:
         self.rdbms_type = rdbms_type
         self.rdbms = rdbms
         self.mongodb = mongodb
+        self.collections = None
+        self.cardinalities = None
+        self.target = None
+        self.relations = None
 
-    def generate_ddl(self):
-        ddl = ""
-        self.mongodb.init_collection()
-        collections = self.mongodb.get_collections()
-        cardinalities = self.mongodb.mapping_all_cardinalities()
+    def create_rdbms(self):
 
         if self.rdbms_type == "postgresql":
-            postgresql = PostgreSQL(
-                host=self.rdbms.host,
-                port=self.rdbms.port,
-                db=self.rdbms.db,
-                username=self.rdbms.username,
-                password=self.rdbms.password,
-            )
-            postgresql.process_mapping_cardinalities(
-                self.mongodb, collections, cardinalities
-            )
-            postgresql.process_collection(self.mongodb, collections)
+            return PostgreSQL(**self.rdbms.model_dump())
 
-            schema = postgresql.relations["object"]
+        elif self.rdbms_type == "mysql":
+            return MySQL(**self.rdbms.model_dump())
 
-            ddl = postgresql.generate_ddl(schema)
+        return None
 
-        elif self.rdbms_type == "mysql":
-            mysql = MySQL(
-                host=self.rdbms.host,
-                port=self.rdbms.port,
-                db=self.rdbms.db,
-                username=self.rdbms.username,
-                password=self.rdbms.password,
-            )
-            mysql.process_mapping_cardinalities(
-                self.mongodb, collections, cardinalities
-            )
-            mysql.process_collection(self.mongodb, collections)
+    def analyze(self):
 
-            schema = mysql.relations["object"]
+        if self.mongodb.use_cache is False:
+            return self.run_analysis()
 
-            ddl = mysql.generate_ddl(schema)
+        key = self.mongodb.get_cache_key("analysis", self.rdbms_type)
+        fingerprint = self.mongodb.get_fingerprint()
 
-        return ddl
+        analysis = load_cache("analysis", key, fingerprint)
+
+        if analysis is not None:
+            return self.restore_analysis(analysis)
+
+        self.run_analysis()
+
+        save_cache("analysis", key, self.get_analysis(), fingerprint)
+
+        return self
+
+    def get_analysis(self) -> dict:
+        return {
+            "mongodb": self.mongodb.get_analysis_state(),
+            "cardinalities": self.cardinalities,
+            "relations": None if self.target is None else {"object": self.relations},
+        }
+
+    def restore_analysis(self, analysis: dict):
+
+        self.mongodb.restore_analysis_state(analysis["mongodb"])
+        self.collections = self.mongodb.get_collections()
+        self.cardinalities = analysis["cardinalities"]
+
+        self.target = self.create_rdbms()
+
+        if self.target is not None:
+            self.relations = analysis["relations"]["object"]
+
+        return self
+
+    def run_analysis(self):
 
-    def implement_ddl(self):
-        ddl = ""
-        success = False
         self.mongodb.init_collection()
-        collections = self.mongodb.get_collections()
-        cardinalities = self.mongodb.mapping_all_cardinalities()
+        self.collections = self.mongodb.get_collections()
+        self.cardinalities = self.mongodb.mapping_all_cardinalities()
 
-        if self.rdbms_type == "postgresql":
-            postgresql = PostgreSQL(
-                host=self.rdbms.host,
-                port=self.rdbms.port,
-                db=self.rdbms.db,
-                username=self.rdbms.username,
-                password=self.rdbms.password,
-            )
-            postgresql.process_mapping_cardinalities(
-                self.mongodb, collections, cardinalities
+        self.target = self.create_rdbms()
+
+        if self.target is not None:
+            self.relations = self.target.build_relations(
+                self.mongodb, self.collections, self.cardinalities
             )
-            postgresql.process_collection(self.mongodb, collections)
 
-            schema = postgresql.relations["object"]
+        return self
 
-            ddl = postgresql.generate_ddl(schema)
+    def is_analyzed(self) -> bool:
+        return self.cardinalities is not None
 
-            if ddl != "":
-                success = postgresql.execute_query(ddl)
+    def generate_ddl(self):
+        ddl = ""
 
-        elif self.rdbms_type == "mysql":
-            mysql = MySQL(
-                host=self.rdbms.host,
-                port=self.rdbms.port,
-                db=self.rdbms.db,
-                username=self.rdbms.username,
-                password=self.rdbms.password,
-            )
-            mysql.process_mapping_cardinalities(
-                self.mongodb, collections, cardinalities
-            )
-            mysql.process_collection(self.mongodb, collections)
+        if not self.is_analyzed():
+            self.analyze()
+
+        if self.target is not None:
+            ddl = self.target.generate_ddl(self.relations)
+
+        return ddl
+
+    def implement_ddl(self):
+        success = False
+
+        if not self.is_analyzed():
+            self.analyze()
 
-            schema = mysql.relations["object"]
+        if self.target is None:
+            return success
 
-            ddl = mysql.generate_ddl(schema)
+        if self.rdbms.deferred_constraints:
+            ddl = self.target.generate_table_ddl(self.relations)
+        else:
+            schema, _ = self.target.split_cyclic_foreign_keys(self.relations)
+            ddl = self.target.generate_ddl(schema)
 
-            if ddl != "":
-                success = mysql.execute_query(ddl)
+        if ddl != "":
+            success = self.target.execute_query(ddl)
 
         return success
 
-    def migrate_data(self):
+    def migrate_data(self, job=None):
         success = False
-        self.mongodb.init_collection()
-        collections = self.mongodb.get_collections()
-        cardinalities = self.mongodb.mapping_all_cardinalities()
 
-        if self.rdbms_type == "postgresql":
-            postgresql = PostgreSQL(
-                host=self.rdbms.host,
-                port=self.rdbms.port,
-                db=self.rdbms.db,
-                username=self.rdbms.username,
-                password=self.rdbms.password,
-            )
-            postgresql.process_mapping_cardinalities(
-                self.mongodb, collections, cardinalities
+        if not self.is_analyzed():
+            self.analyze()
+
+        if self.target is not None:
+            success = self.target.insert_data_by_relation(
+                self.mongodb, self.cardinalities, self.relations, job
             )
-            postgresql.process_collection(self.mongodb, collections)
 
-            success = postgresql.insert_data_by_relation(self.mongodb, cardinalities)
+            if success is True and self.rdbms.deferred_constraints:
+                success = self.target.add_constraints(self.relations)
 
-        elif self.rdbms_type == "mysql":
-            mysql = MySQL(
-                host=self.rdbms.host,
-                port=self.rdbms.port,
-                db=self.rdbms.db,
-                username=self.rdbms.username,
-                password=self.rdbms.password,
-            )
-            mysql.process_mapping_cardinalities(
-                self.mongodb, collections, cardinalities
-            )
-            mysql.process_collection(self.mongodb, collections)
+            elif success is True:
+                _, cyclic = self.target.split_cyclic_foreign_keys(self.relations)
+                success = self.target.add_foreign_keys(cyclic, self.relations)
 
-            success = mysql.insert_data_by_relation(self.mongodb, cardinalities)
+        return success
+
+    def sync_data(self, job=None):
+        success = False
+
+        if not self.is_analyzed():
+            self.analyze()
+
+        if self.target is not None:
+            success = self.target.sync_changes(
+                self.mongodb, self.cardinalities, self.relations, job
+            )
 
         return success
@@ -54,3 +54,16 @@ class CardinalitiesType(str, Enum):
     ONE_TO_ONE = "one-to-one"
     ONE_TO_MANY = "one-to-many"
     MANY_TO_MANY = "many-to-many"
+
+
+class LoadMode(str, Enum):
+    INSERT = "insert"
+    BULK = "bulk"
+
+
+class JobStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
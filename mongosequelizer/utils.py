@@ -0,0 +1,16 @@
+import itertools
+from typing import Iterable, Iterator, List
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[List]:
+
+    if size < 1:
+        raise ValueError("batch size must be at least 1")
+
+    iterator = iter(iterable)
+
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
@@ -2,6 +2,7 @@ from fastapi import APIRouter, Response, status
 from fastapi.encoders import jsonable_encoder
 from fastapi.responses import JSONResponse
 
+from app.executor import executor
 from mongosequelizer.mongodb.mongodb import MongoDB
 
 router = APIRouter(prefix="/api/mongodb", tags=["mongodb"])
@@ -18,7 +19,7 @@ async def root_mongodb():
 @router.post("/test-connection")
 async def test_connection(mongodb: MongoDB):
 
-    connection_status = mongodb.test_connection()
+    connection_status = await executor.run(mongodb.test_connection)
 
     if connection_status:
         return JSONResponse(
@@ -36,7 +37,7 @@ async def test_connection(mongodb: MongoDB):
 @router.post("/display-schema")
 async def display_schema(mongodb: MongoDB):
 
-    schema = mongodb.display_schema()
+    schema = await executor.run(mongodb.display_schema)
 
     if schema:
         return JSONResponse(
@@ -1,12 +1,20 @@
+from typing import Optional
+
 from fastapi import APIRouter, Response, status
 from fastapi.encoders import jsonable_encoder
 from fastapi.responses import JSONResponse
 
+from app.executor import executor, job_executor, sync_executor
+from mongosequelizer.job import (cancel_job, create_job, get_job,
+                                 run_migration_job, run_sync_job)
 from mongosequelizer.mongodb.mongodb import MongoDB
 from mongosequelizer.mysql.mysql import MySQL
 from mongosequelizer.postgresql.postgresql import PostgreSQL
 from mongosequelizer.rdbms.rdbms import Rdbms
+from mongosequelizer.session import (SessionCredentials, create_session,
+                                     delete_session, get_session)
 from mongosequelizer.transformator import MongoSequelizer
+from mongosequelizer.type import JobStatus
 
 router = APIRouter(prefix="/api/rdbms", tags=["rdbms"])
 
@@ -23,24 +31,12 @@ async def root_rdbms():
 async def test_connection(rdbms_type: str, rdbms: Rdbms):
     connection_status = False
     if rdbms_type == "postgresql":
-        postgresql = PostgreSQL(
-            host=rdbms.host,
-            port=rdbms.port,
-            db=rdbms.db,
-            username=rdbms.username,
-            password=rdbms.password,
-        )
-        connection_status = postgresql.test_connection()
+        postgresql = PostgreSQL(**rdbms.model_dump())
+        connection_status = await executor.run(postgresql.test_connection)
 
     elif rdbms_type == "mysql":
-        mysql = MySQL(
-            host=rdbms.host,
-            port=rdbms.port,
-            db=rdbms.db,
-            username=rdbms.username,
-            password=rdbms.password,
-        )
-        connection_status = mysql.test_connection()
+        mysql = MySQL(**rdbms.model_dump())
+        connection_status = await executor.run(mysql.test_connection)
 
     if connection_status:
         return JSONResponse(
@@ -58,7 +54,7 @@ async def test_connection(rdbms_type: str, rdbms: Rdbms):
 @router.post("/display-schema")
 async def display_schema(rdbms_type: str, rdbms: Rdbms, mongodb: MongoDB):
     ddl = ""
-    ddl = MongoSequelizer(rdbms_type, rdbms, mongodb).generate_ddl()
+    ddl = await executor.run(MongoSequelizer(rdbms_type, rdbms, mongodb).generate_ddl)
     if ddl != "":
         return JSONResponse(
             content=jsonable_encoder(ddl), status_code=status.HTTP_201_CREATED
@@ -71,7 +67,9 @@ async def display_schema(rdbms_type: str, rdbms: Rdbms, mongodb: MongoDB):
 async def implement_schema(rdbms_type: str, rdbms: Rdbms, mongodb: MongoDB):
 
     success = False
-    success = MongoSequelizer(rdbms_type, rdbms, mongodb).implement_ddl()
+    success = await executor.run(
+        MongoSequelizer(rdbms_type, rdbms, mongodb).implement_ddl
+    )
 
     if success is True:
         return JSONResponse(
@@ -84,7 +82,9 @@ async def implement_schema(rdbms_type: str, rdbms: Rdbms, mongodb: MongoDB):
 @router.post("/migrate-data")
 async def migrate_data(rdbms_type: str, rdbms: Rdbms, mongodb: MongoDB):
     success = False
-    success = MongoSequelizer(rdbms_type, rdbms, mongodb).migrate_data()
+    success = await executor.run(
+        MongoSequelizer(rdbms_type, rdbms, mongodb).migrate_data
+    )
 
     if success is True:
         return JSONResponse(
@@ -92,3 +92,200 @@ async def migrate_data(rdbms_type: str, rdbms: Rdbms, mongodb: MongoDB):
         )
     else:
         return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.post("/analysis")
+async def create_analysis(rdbms_type: str, rdbms: Rdbms, mongodb: MongoDB):
+
+    sequelizer = await executor.run(MongoSequelizer(rdbms_type, rdbms, mongodb).analyze)
+    analysis_id = create_session(sequelizer)
+
+    return JSONResponse(
+        content={"analysis_id": analysis_id}, status_code=status.HTTP_201_CREATED
+    )
+
+
+@router.post("/analysis/{analysis_id}/display-schema")
+async def display_analysis_schema(analysis_id: str):
+
+    sequelizer = await executor.run(get_session, analysis_id)
+
+    if sequelizer is None:
+        return JSONResponse(
+            content={"message": "analysis not found"},
+            status_code=status.HTTP_404_NOT_FOUND,
+        )
+
+    ddl = await executor.run(sequelizer.generate_ddl)
+    if ddl != "":
+        return JSONResponse(
+            content=jsonable_encoder(ddl), status_code=status.HTTP_201_CREATED
+        )
+    else:
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.post("/analysis/{analysis_id}/implement-schema")
+async def implement_analysis_schema(
+    analysis_id: str, credentials: Optional[SessionCredentials] = None
+):
+
+    sequelizer = await executor.run(get_session, analysis_id, credentials)
+
+    if sequelizer is None:
+        return JSONResponse(
+            content={"message": "analysis not found"},
+            status_code=status.HTTP_404_NOT_FOUND,
+        )
+
+    success = await executor.run(sequelizer.implement_ddl)
+
+    if success is True:
+        return JSONResponse(
+            content=jsonable_encoder(success), status_code=status.HTTP_201_CREATED
+        )
+    else:
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.post("/analysis/{analysis_id}/migrate-data")
+async def migrate_analysis_data(
+    analysis_id: str, credentials: Optional[SessionCredentials] = None
+):
+
+    sequelizer = await executor.run(get_session, analysis_id, credentials)
+
+    if sequelizer is None:
+        return JSONResponse(
+            content={"message": "analysis not found"},
+            status_code=status.HTTP_404_NOT_FOUND,
+        )
+
+    success = await executor.run(sequelizer.migrate_data)
+
+    if success is True:
+        return JSONResponse(
+            content=jsonable_encoder(success), status_code=status.HTTP_201_CREATED
+        )
+    else:
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.delete("/analysis/{analysis_id}")
+async def delete_analysis(analysis_id: str):
+
+    if delete_session(analysis_id):
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+    return JSONResponse(
+        content={"message": "analysis not found"},
+        status_code=status.HTTP_404_NOT_FOUND,
+    )
+
+
+@router.post("/jobs/migrate-data")
+async def submit_migrate_data(rdbms_type: str, rdbms: Rdbms, mongodb: MongoDB):
+
+    job = create_job()
+    job_executor.submit(
+        run_migration_job, job, MongoSequelizer(rdbms_type, rdbms, mongodb)
+    )
+
+    return JSONResponse(
+        content={"job_id": job.id}, status_code=status.HTTP_202_ACCEPTED
+    )
+
+
+@router.post("/analysis/{analysis_id}/jobs/migrate-data")
+async def submit_analysis_migrate_data(
+    analysis_id: str, credentials: Optional[SessionCredentials] = None
+):
+
+    sequelizer = await executor.run(get_session, analysis_id, credentials)
+
+    if sequelizer is None:
+        return JSONResponse(
+            content={"message": "analysis not found"},
+            status_code=status.HTTP_404_NOT_FOUND,
+        )
+
+    job = create_job()
+    job_executor.submit(run_migration_job, job, sequelizer)
+
+    return JSONResponse(
+        content={"job_id": job.id}, status_code=status.HTTP_202_ACCEPTED
+    )
+
+
+@router.post("/jobs/sync-data")
+async def submit_sync_data(rdbms_type: str, rdbms: Rdbms, mongodb: MongoDB):
+
+    sequelizer = MongoSequelizer(rdbms_type, rdbms, mongodb)
+    job = create_job()
+
+    if sync_executor.try_submit(run_sync_job, job, sequelizer) is None:
+        job.set_status(JobStatus.FAILED, "too many sync jobs running")
+        return JSONResponse(
+            content={"message": "too many sync jobs running"},
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        )
+
+    return JSONResponse(
+        content={"job_id": job.id}, status_code=status.HTTP_202_ACCEPTED
+    )
+
+
+@router.post("/analysis/{analysis_id}/jobs/sync-data")
+async def submit_analysis_sync_data(
+    analysis_id: str, credentials: Optional[SessionCredentials] = None
+):
+
+    sequelizer = await executor.run(get_session, analysis_id, credentials)
+
+    if sequelizer is None:
+        return JSONResponse(
+            content={"message": "analysis not found"},
+            status_code=status.HTTP_404_NOT_FOUND,
+        )
+
+    job = create_job()
+
+    if sync_executor.try_submit(run_sync_job, job, sequelizer) is None:
+        job.set_status(JobStatus.FAILED, "too many sync jobs running")
+        return JSONResponse(
+            content={"message": "too many sync jobs running"},
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        )
+
+    return JSONResponse(
+        content={"job_id": job.id}, status_code=status.HTTP_202_ACCEPTED
+    )
+
+
+@router.get("/jobs/{job_id}")
+async def migration_job_status(job_id: str):
+
+    job = get_job(job_id)
+
+    if job is None:
+        return JSONResponse(
+            content={"message": "job not found"},
+            status_code=status.HTTP_404_NOT_FOUND,
+        )
+
+    return JSONResponse(content=jsonable_encoder(job), status_code=status.HTTP_200_OK)
+
+
+@router.post("/jobs/{job_id}/cancel")
+async def cancel_migration_job(job_id: str):
+
+    if cancel_job(job_id):
+        return JSONResponse(
+            content={"job_id": job_id, "message": "cancellation requested"},
+            status_code=status.HTTP_202_ACCEPTED,
+        )
+
+    return JSONResponse(
+        content={"message": "job not found or already finished"},
+        status_code=status.HTTP_404_NOT_FOUND,
+    )
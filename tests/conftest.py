@@ -0,0 +1,138 @@
+import sqlite3
+import threading
+
+import pytest
+from psycopg2.extensions import adapt
+
+import mongosequelizer.postgresql.postgresql as postgresql
+from mongosequelizer.postgresql.postgresql import PostgreSQL
+
+DATA = {
+    "users": [{"_id": i, "name": f"user{i}"} for i in range(7)],
+    "orders": [{"sku": f"s{i}", "users__id": i % 7} for i in range(11)],
+}
+
+SCHEMA = {
+    "users": {
+        "name": "users",
+        "attributes": {"object": {}},
+        "primary_key": None,
+        "foreign_key": {"object": {}},
+    },
+    "orders": {
+        "name": "orders",
+        "attributes": {"object": {}},
+        "primary_key": None,
+        "foreign_key": {"object": {"orders.users__id": {"name": "users._id"}}},
+    },
+}
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.cursor = connection.connection.cursor()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.cursor.close()
+
+    def mogrify(self, template, args):
+        return template % tuple(adapt(arg).getquoted() for arg in args)
+
+    def execute(self, query, params=()):
+        if isinstance(query, bytes):
+            query = query.decode(self.connection.encoding)
+        self.cursor.execute(query.replace("%s", "?"), params)
+
+    def executemany(self, query, rows):
+        self.cursor.executemany(query.replace("%s", "?"), rows)
+
+    def fetchall(self):
+        return self.cursor.fetchall()
+
+    def close(self):
+        self.cursor.close()
+
+
+class FakeConnection:
+    closed = False
+    encoding = "UTF8"
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.connection.commit()
+
+    def rollback(self):
+        self.connection.rollback()
+
+
+class FakePool:
+    def __init__(self):
+        self.connection = sqlite3.connect(":memory:", check_same_thread=False)
+        self.connection.execute("CREATE TABLE users (_id INTEGER, name TEXT)")
+        self.connection.execute("CREATE TABLE orders (sku TEXT, users__id INTEGER)")
+        self.connection.commit()
+        self.maxconn = 2
+        self.semaphore = threading.BoundedSemaphore(self.maxconn)
+        self.in_use = 0
+
+    def getconn(self):
+        if not self.semaphore.acquire(timeout=1):
+            raise TimeoutError("pool exhausted")
+        self.in_use += 1
+        return FakeConnection(self.connection)
+
+    def putconn(self, connection):
+        self.in_use -= 1
+        self.semaphore.release()
+
+
+class FakeMongoDB:
+    def __init__(self, fail_after=None):
+        self.fail_after = fail_after
+
+    def get_field(self, coll_name, field_name):
+        return None
+
+    def get_max_value(self, coll_name, field_name):
+        return None
+
+    def get_data_pipeline(self, relation, cardinality_type):
+        return list(relation.keys())[0], [], None
+
+    def stream_data_pipeline(self, data_pipeline, offset=0, ordered=False):
+        for i, row in enumerate(DATA[data_pipeline[0]][offset:]):
+            if self.fail_after is not None and offset + i >= self.fail_after:
+                raise RuntimeError("source connection lost")
+            yield row
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = FakePool()
+    monkeypatch.setattr(postgresql, "get_pool", lambda *args, **kwargs: pool)
+    return pool
+
+
+def create_postgresql(batch_size=3, **kwargs):
+    return PostgreSQL(
+        host="localhost",
+        port=5432,
+        db="db",
+        username="user",
+        password="pass",
+        batch_size=batch_size,
+        **kwargs,
+    )
+
+
+def select(pool, query):
+    return sorted(pool.connection.execute(query).fetchall())
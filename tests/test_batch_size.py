@@ -0,0 +1,35 @@
+from mongosequelizer.postgresql.postgresql import PostgreSQL
+from tests.conftest import create_postgresql
+
+
+class FakeConnection:
+    def close(self):
+        pass
+
+
+def test_batch_size_can_be_set_per_table(monkeypatch):
+    batches = []
+    monkeypatch.setattr(
+        PostgreSQL, "create_raw_connection", lambda cls: FakeConnection()
+    )
+    monkeypatch.setattr(PostgreSQL, "release_connection", lambda cls, connection: None)
+    monkeypatch.setattr(
+        PostgreSQL,
+        "insert_batch",
+        lambda cls, connection, table, batch, checkpoint=None: batches.append(
+            (table, len(batch))
+        )
+        or len(batch),
+    )
+
+    rdbms = create_postgresql(batch_size=4, batch_sizes={"orders": 2})
+
+    assert rdbms.load_relation("users", ({"_id": i} for i in range(6))) == 6
+    assert rdbms.load_relation("orders", ({"_id": i} for i in range(5))) == 5
+    assert batches == [
+        ("users", 4),
+        ("users", 2),
+        ("orders", 2),
+        ("orders", 2),
+        ("orders", 1),
+    ]
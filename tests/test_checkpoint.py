@@ -0,0 +1,48 @@
+import pytest
+
+from mongosequelizer.rdbms.rdbms import CHECKPOINT_TABLE
+from tests.conftest import DATA, SCHEMA, FakeMongoDB, create_postgresql, select
+
+
+def test_checkpoint_resume_loads_every_row_once(pool):
+
+    with pytest.raises(RuntimeError):
+        create_postgresql(checkpoint=True).insert_data_by_relation(
+            FakeMongoDB(fail_after=5), [], SCHEMA
+        )
+
+    assert pool.in_use == 0
+    assert select(pool, f"SELECT * FROM {CHECKPOINT_TABLE}") == [("users", 3, 0)]
+
+    assert create_postgresql(resume=True).insert_data_by_relation(
+        FakeMongoDB(), [], SCHEMA
+    )
+
+    assert pool.in_use == 0
+    assert select(pool, "SELECT _id, name FROM users") == [
+        (row["_id"], row["name"]) for row in DATA["users"]
+    ]
+    assert select(pool, "SELECT sku, users__id FROM orders") == sorted(
+        (row["sku"], row["users__id"]) for row in DATA["orders"]
+    )
+    assert select(pool, f"SELECT * FROM {CHECKPOINT_TABLE}") == [
+        ("orders", 11, 1),
+        ("users", 7, 1),
+    ]
+
+
+def test_resume_skips_completed_tables(pool):
+
+    rdbms = create_postgresql(checkpoint=True)
+    assert rdbms.insert_data_by_relation(FakeMongoDB(), [], SCHEMA)
+
+    assert create_postgresql(resume=True).insert_data_by_relation(
+        FakeMongoDB(fail_after=0), [], SCHEMA
+    )
+
+    assert pool.in_use == 0
+    assert len(select(pool, "SELECT * FROM users")) == len(DATA["users"])
+    assert rdbms.get_checkpoints() == {
+        "users": {"rows_done": 7, "completed": True},
+        "orders": {"rows_done": 11, "completed": True},
+    }
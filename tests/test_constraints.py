@@ -0,0 +1,38 @@
+from mongosequelizer.postgresql.postgresql import PostgreSQL
+from tests.conftest import create_postgresql
+
+DDL = """
+ALTER TABLE users ADD CONSTRAINT uq_users_email UNIQUE (email);
+
+ALTER TABLE orders ADD CONSTRAINT fk_orders_users__id
+    FOREIGN KEY (users__id) REFERENCES users(_id);
+ALTER TABLE carts ADD CONSTRAINT fk_carts_users__id
+    FOREIGN KEY (users__id) REFERENCES users(_id);"""
+
+
+def patch_catalog(monkeypatch, existing):
+    executed = []
+    monkeypatch.setattr(PostgreSQL, "get_constraint_names", lambda cls: existing)
+    monkeypatch.setattr(
+        PostgreSQL, "execute_query", lambda cls, query: executed.append(query) or True
+    )
+    return executed
+
+
+def test_constraints_in_catalog_are_skipped(monkeypatch):
+    executed = patch_catalog(monkeypatch, {"uq_users_email", "fk_orders_users__id"})
+
+    assert create_postgresql().execute_constraints(DDL)
+    assert len(executed) == 1
+    assert "fk_carts_users__id" in executed[0]
+    assert "uq_users_email" not in executed[0]
+    assert "fk_orders_users__id" not in executed[0]
+
+
+def test_nothing_runs_when_every_constraint_exists(monkeypatch):
+    executed = patch_catalog(
+        monkeypatch, {"uq_users_email", "fk_orders_users__id", "fk_carts_users__id"}
+    )
+
+    assert create_postgresql().execute_constraints(DDL)
+    assert executed == []
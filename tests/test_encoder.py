@@ -0,0 +1,62 @@
+import re
+
+from mongosequelizer.mysql.mysql import MySQL
+from tests.conftest import create_postgresql
+
+ESCAPES = {"\\\\": "\\", "\\t": "\t", "\\n": "\n", "\\r": "\r"}
+
+
+def decode_text_row(line):
+    assert line.endswith("\n")
+    return [
+        None if value == "\\N" else re.sub(r"\\.", lambda m: ESCAPES[m[0]], value)
+        for value in line[:-1].split("\t")
+    ]
+
+
+class FakeCursor:
+    def copy_expert(self, query, buffer):
+        self.query = query
+        self.data = buffer.read()
+
+
+def test_encode_text_value():
+    postgresql = create_postgresql()
+
+    assert postgresql.encode_text_value(None) == "\\N"
+    assert postgresql.encode_text_value(True) == "t"
+    assert postgresql.encode_text_value(False) == "f"
+    assert postgresql.encode_text_value(0) == "0"
+    assert postgresql.encode_text_value(1.5) == "1.5"
+    assert postgresql.encode_text_value("a\\b\tc\nd\re") == "a\\\\b\\tc\\nd\\re"
+    assert postgresql.encode_text_value("\\N") == "\\\\N"
+
+
+def test_encode_text_row_round_trips():
+    row = ("tab\there", None, "line\r\nbreak", "back\\slash", "\\N", "")
+
+    line = create_postgresql().encode_text_row(row)
+
+    assert line.count("\n") == 1
+    assert decode_text_row(line) == list(row)
+
+
+def test_copy_rows_streams_every_row():
+    cursor = FakeCursor()
+    rows = [(1, "a\tb", None), (2, "c", True)]
+
+    create_postgresql().copy_rows(cursor, "users", ["_id", "name", "active"], rows)
+
+    assert cursor.query == "COPY users (_id, name, active) FROM STDIN"
+    assert cursor.data == "1\ta\\tb\t\\N\n2\tc\tt\n"
+
+
+def test_mysql_encodes_booleans_as_integers():
+    mysql = MySQL(
+        host="localhost", port=3306, db="db", username="user", password="pass"
+    )
+
+    assert mysql.encode_text_value(True) == "1"
+    assert mysql.encode_text_value(False) == "0"
+    assert mysql.encode_text_value(None) == "\\N"
+    assert mysql.encode_text_row(("a\tb", 1)) == "a\\tb\t1\n"
@@ -0,0 +1,126 @@
+from mongosequelizer.rdbms.rdbms import WATERMARK_TABLE
+from tests.conftest import create_postgresql, select
+
+SCHEMA = {
+    "users": {
+        "name": "users",
+        "attributes": {"object": {}},
+        "primary_key": None,
+        "foreign_key": {"object": {}},
+    },
+}
+
+
+def matches(value, bounds):
+    if "$not" in bounds:
+        return not matches(value, bounds["$not"])
+    if value is None:
+        return False
+    if "$gt" in bounds and not value > bounds["$gt"]:
+        return False
+    if "$lte" in bounds and not value <= bounds["$lte"]:
+        return False
+    return True
+
+
+class FakeMongoDB:
+    def __init__(self, documents, transform=None):
+        self.documents = documents
+        self.transform = transform
+        self.matches = []
+
+    def get_field(self, coll_name, field_name):
+        return None
+
+    def get_data_pipeline(self, relation, cardinality_type):
+        return list(relation.keys())[0], [], self.transform
+
+    def get_max_value(self, coll_name, field_name):
+        return max(document[field_name] for document in self.documents)
+
+    def filter_data_pipeline(self, data_pipeline, match):
+        self.matches.append(match)
+        coll_name, pipeline, transform = data_pipeline
+        return coll_name, pipeline + [{"$match": match}], transform
+
+    def stream_data_pipeline(self, data_pipeline, offset=0, ordered=False):
+        for document in self.documents:
+            if all(
+                matches(document.get(field), bounds)
+                for stage in data_pipeline[1]
+                for field, bounds in stage["$match"].items()
+            ):
+                yield {"_id": document["_id"], "name": document["name"]}
+
+
+def test_incremental_load_continues_from_full_load(pool):
+
+    documents = [{"_id": i, "name": f"user{i}", "updated": i} for i in range(5)]
+    mongodb = FakeMongoDB(documents)
+
+    assert create_postgresql(watermark_field="updated").insert_data_by_relation(
+        mongodb, [], SCHEMA
+    )
+
+    rdbms = create_postgresql(incremental=True, watermark_field="updated")
+
+    assert mongodb.matches == [{"updated": {"$not": {"$gt": 4}}}]
+    assert rdbms.get_watermarks() == {"users": 4}
+
+    documents.append({"_id": 5, "name": "user5", "updated": 5})
+    assert rdbms.insert_data_by_relation(mongodb, [], SCHEMA)
+
+    assert mongodb.matches[-1] == {"updated": {"$gt": 4, "$lte": 5}}
+    assert pool.in_use == 0
+    assert select(pool, "SELECT _id FROM users") == [(i,) for i in range(6)]
+    assert select(
+        pool, f"SELECT collection_name, watermark FROM {WATERMARK_TABLE}"
+    ) == [("users", "5")]
+
+
+def test_incremental_load_rejects_generated_ids(pool):
+
+    documents = [{"_id": 0, "name": "user0", "updated": 0}]
+    mongodb = FakeMongoDB(documents, transform=lambda datas: datas)
+
+    rdbms = create_postgresql(incremental=True, watermark_field="updated")
+    assert not rdbms.insert_data_by_relation(mongodb, [], SCHEMA)
+
+    assert mongodb.matches == []
+    assert select(pool, "SELECT _id FROM users") == []
+
+
+def test_incremental_load_skips_rows_already_loaded(pool):
+
+    pool.connection.execute("CREATE UNIQUE INDEX users_id ON users (_id)")
+    pool.connection.execute("INSERT INTO users VALUES (3, 'taken')")
+    pool.connection.commit()
+
+    documents = [{"_id": i, "name": f"user{i}", "updated": i} for i in range(5)]
+
+    rdbms = create_postgresql(incremental=True, watermark_field="updated")
+    assert rdbms.insert_data_by_relation(FakeMongoDB(documents), [], SCHEMA)
+
+    assert pool.in_use == 0
+    assert rdbms.get_watermarks() == {"users": 4}
+    assert select(pool, "SELECT _id, name FROM users") == [
+        (i, "taken" if i == 3 else f"user{i}") for i in range(5)
+    ]
+
+
+def test_rejected_rows_keep_the_watermark(pool):
+
+    pool.connection.execute("DROP TABLE users")
+    pool.connection.execute(
+        "CREATE TABLE users (_id INTEGER, name TEXT CHECK (name <> 'user3'))"
+    )
+    pool.connection.commit()
+
+    documents = [{"_id": i, "name": f"user{i}", "updated": i} for i in range(5)]
+
+    rdbms = create_postgresql(incremental=True, watermark_field="updated")
+    assert not rdbms.insert_data_by_relation(FakeMongoDB(documents), [], SCHEMA)
+
+    assert pool.in_use == 0
+    assert rdbms.get_watermarks() == {}
+    assert select(pool, "SELECT _id FROM users") == [(0,), (1,), (2,), (4,)]
@@ -0,0 +1,101 @@
+from mongosequelizer.mongodb.field import Field
+from mongosequelizer.mongodb.mongodb import MongoDB
+from mongosequelizer.type import MongoType
+
+DATA = {
+    "users": [{"_id": i} for i in range(1, 13)],
+    "products": [{"_id": 100 + i, "users_id": 1 + i % 8} for i in range(20)],
+    "reviews": [{"_id": 200 + i, "users_id": [1, 40 + i]} for i in range(5)],
+}
+
+
+def field(name):
+    return Field(name=name, data_type=MongoType.INTEGER, not_null=True, unique=False)
+
+
+def values_of(document, field_name):
+    value = document.get(field_name)
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+class FakeCollection:
+    def __init__(self, name, queries):
+        self.name = name
+        self.queries = queries
+
+    def aggregate(self, pipeline, **kwargs):
+        self.queries.append(self.name)
+
+        field_name = list(pipeline[0]["$match"].keys())[0]
+        present = {
+            value
+            for document in DATA[self.name]
+            for value in values_of(document, field_name)
+        }
+
+        if "$in" not in pipeline[0]["$match"][field_name]:
+            return [{"_id": value} for value in sorted(present)]
+
+        matched = present & set(pipeline[0]["$match"][field_name]["$in"])
+        return [{"matched": len(matched)}] if matched else []
+
+
+class FakeDatabase:
+    def __init__(self, queries):
+        self.queries = queries
+
+    def __getitem__(self, name):
+        return FakeCollection(name, self.queries)
+
+
+class FakeClient:
+    def __init__(self):
+        self.queries = []
+
+    def __getitem__(self, db):
+        return FakeDatabase(self.queries)
+
+
+def create_mongodb(monkeypatch, client):
+    monkeypatch.setattr(MongoDB, "create_client", lambda cls: client)
+
+    return MongoDB(
+        host="localhost",
+        port=27017,
+        db="shop",
+        username="user",
+        password="pass",
+        batch_size=3,
+        use_cache=False,
+        collections={
+            "users": [field("_id")],
+            "products": [field("_id"), field("users_id")],
+            "reviews": [field("_id"), field("users_id")],
+        },
+    )
+
+
+def test_referencing_field_must_be_contained_in_key(monkeypatch):
+    client = FakeClient()
+
+    result = create_mongodb(monkeypatch, client).check_key_in_other_collections(
+        "_id", "users"
+    )
+
+    assert result == {
+        "object": {"products": {"collection": "products", "field": "users_id"}},
+        "status": True,
+    }
+
+
+def test_containment_stops_at_first_missing_value(monkeypatch):
+    client = FakeClient()
+
+    result = create_mongodb(monkeypatch, client).check_key_in_other_collection(
+        "_id", "users", "reviews"
+    )
+
+    assert result["status"] is False
+    assert client.queries == ["reviews", "users"]
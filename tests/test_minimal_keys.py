@@ -0,0 +1,66 @@
+from mongosequelizer.mongodb.mongodb import MongoDB
+
+ROWS = [{"a": a, "b": b, "c": 0, "d": (a + b) % 2} for a in range(3) for b in range(3)]
+
+
+def create_mongodb(**kwargs):
+    return MongoDB(
+        host="localhost",
+        port=27017,
+        db="db",
+        username="user",
+        password="pass",
+        **kwargs
+    )
+
+
+def count_distinct_by(rows, queried):
+    def count_distinct(fields):
+        queried.append(tuple(fields))
+        return len({tuple(row[field] for field in fields) for row in rows})
+
+    return count_distinct
+
+
+def test_minimal_keys_skip_supersets():
+    queried = []
+    keys = create_mongodb().discover_minimal_keys(
+        ["a", "b", "c", "d"], len(ROWS), count_distinct_by(ROWS, queried)
+    )
+
+    assert keys == ["a,b"]
+    assert ("a", "b", "c") not in queried
+    assert ("a", "b", "d") not in queried
+
+
+def test_minimal_keys_prune_combinations_that_cannot_be_unique():
+    queried = []
+    keys = create_mongodb().discover_minimal_keys(
+        ["c", "d"], len(ROWS), count_distinct_by(ROWS, queried)
+    )
+
+    assert keys == []
+    assert queried == [("c",), ("d",)]
+
+
+def test_minimal_keys_respect_max_key_width():
+    rows = [
+        {"a": a, "b": b, "c": c} for a in range(2) for b in range(2) for c in range(2)
+    ]
+    fields = ["a", "b", "c"]
+
+    assert create_mongodb().discover_minimal_keys(
+        fields, len(rows), count_distinct_by(rows, [])
+    ) == ["a,b,c"]
+    assert (
+        create_mongodb(max_key_width=2).discover_minimal_keys(
+            fields, len(rows), count_distinct_by(rows, [])
+        )
+        == []
+    )
+    assert (
+        create_mongodb(max_key_width=1).discover_minimal_keys(
+            fields, len(rows), count_distinct_by(rows, [])
+        )
+        == []
+    )
@@ -0,0 +1,89 @@
+import re
+
+from mongosequelizer.mysql.mysql import DUPLICATE_ENTRY, MySQL
+from mongosequelizer.type import LoadMode
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.warning_count = 0
+        self.warnings = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def execute(self, query, params=()):
+        if query == "SHOW WARNINGS":
+            return
+
+        filename = re.search(r"INFILE '([^']+)'", query)[1]
+        with open(filename, encoding="utf-8") as file:
+            lines = file.read().splitlines()
+
+        self.warnings = []
+        for line in lines:
+            key = line.split("\t")[0]
+            if key in self.connection.keys or key in self.connection.pending:
+                self.warnings.append(
+                    ("Warning", DUPLICATE_ENTRY, f"Duplicate entry '{key}'")
+                )
+            else:
+                self.connection.pending.add(key)
+
+        self.warning_count = len(self.warnings)
+
+    def fetchall(self):
+        return self.warnings
+
+
+class FakeConnection:
+    def __init__(self, keys):
+        self.keys = set(keys)
+        self.pending = set()
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.keys |= self.pending
+        self.pending = set()
+
+    def rollback(self):
+        self.pending = set()
+
+
+def create_mysql(load_mode=LoadMode.BULK, **kwargs):
+    return MySQL(
+        host="localhost",
+        port=3306,
+        db="db",
+        username="user",
+        password="pass",
+        load_mode=load_mode,
+        **kwargs,
+    )
+
+
+def test_local_infile_only_for_bulk_loads():
+    assert create_mysql().get_connect_args() == {"local_infile": True}
+    assert create_mysql(load_mode=LoadMode.INSERT).get_connect_args() == {}
+
+
+def test_load_data_warnings_fall_back_to_row_by_row():
+    connection = FakeConnection({"2"})
+    batch = [{"_id": i, "name": f"user{i}"} for i in range(4)]
+
+    assert create_mysql().insert_batch(connection, "users", batch) == 3
+    assert connection.keys == {"0", "1", "2", "3"}
+
+
+def test_incremental_load_data_ignores_duplicates():
+    connection = FakeConnection({"2"})
+    batch = [{"_id": i, "name": f"user{i}"} for i in range(4)]
+
+    assert create_mysql(incremental=True).insert_batch(connection, "users", batch) == 4
+    assert connection.keys == {"0", "1", "2", "3"}
@@ -0,0 +1,49 @@
+from mongosequelizer.rdbms.rdbms import Rdbms
+
+
+def relation(name, references):
+    return {
+        "name": name,
+        "attributes": {"object": {}},
+        "primary_key": None,
+        "foreign_key": {
+            "object": {f"{name}.{ref}_id": {"name": f"{ref}._id"} for ref in references}
+        },
+    }
+
+
+def plan(spec):
+    schema = {name: relation(name, references) for name, references in spec.items()}
+    return Rdbms(
+        host="localhost", port=5432, db="db", username="user", password="pass"
+    ).plan_table_levels(schema)
+
+
+def test_acyclic_tables_follow_references():
+    levels, deferred = plan({"a": [], "b": ["a"], "c": ["a", "b"], "d": []})
+
+    assert levels == [["a", "d"], ["b"], ["c"]]
+    assert deferred == {}
+
+
+def test_cycle_reached_through_other_table_is_broken():
+    levels, deferred = plan({"c": ["a"], "a": ["b"], "b": ["a"]})
+
+    assert levels == [["a"], ["c", "b"]]
+    assert deferred == {"a": ["a.b_id"]}
+
+
+def test_only_cycle_foreign_keys_are_deferred():
+    levels, deferred = plan(
+        {"a": ["b"], "b": ["c"], "c": ["a"], "d": ["a"], "e": ["d", "e"]}
+    )
+
+    assert levels == [["a"], ["c", "d"], ["b", "e"]]
+    assert deferred == {"a": ["a.b_id"], "e": ["e.e_id"]}
+
+
+def test_cycle_waits_for_referenced_cycle():
+    levels, deferred = plan({"x": ["y"], "y": ["x"], "p": ["q"], "q": ["p", "x"]})
+
+    assert [table for level in levels for table in level] == ["x", "y", "p", "q"]
+    assert deferred == {"x": ["x.y_id"], "p": ["p.q_id"]}
@@ -0,0 +1,48 @@
+from bson import ObjectId
+from bson.decimal128 import Decimal128
+
+from mongosequelizer.mongodb.snapshot import (MISSING, CollectionSnapshot,
+                                              get_path_value, hash_value)
+
+
+def test_equal_numbers_hash_alike():
+    assert hash_value(1) == hash_value(1.0)
+    assert hash_value(1) == hash_value(Decimal128("1"))
+    assert hash_value(1) != hash_value(1.5)
+
+
+def test_hash_keeps_types_apart():
+    assert hash_value(MISSING) != hash_value(None)
+    assert hash_value(True) != hash_value(1)
+    assert hash_value("1") != hash_value(1)
+    assert hash_value({"a": 1, "b": 2}) != hash_value({"b": 2, "a": 1})
+
+    object_id = ObjectId()
+    assert hash_value(object_id) == hash_value(ObjectId(str(object_id)))
+
+
+def test_path_value_reads_embedded_arrays():
+    document = {"items": [{"sku": "a"}, {"qty": 1}, {"sku": "b"}], "user": {"id": 3}}
+
+    assert get_path_value(document, "items.sku") == ["a", "b"]
+    assert get_path_value(document, "user.id") == 3
+    assert get_path_value(document, "user.name") is MISSING
+
+
+def test_snapshot_counts_distinct_combinations():
+    documents = [
+        {"a": 1, "b": {"c": "x"}},
+        {"a": 1.0, "b": {"c": "y"}},
+        {"a": 2, "b": {"c": "x"}},
+        {"a": 2, "b": {"c": "x"}},
+        {"b": {"c": None}},
+        {"a": None, "b": {}},
+    ]
+
+    snapshot = CollectionSnapshot.from_documents(documents, {"a": "a", "c": "b.c"})
+
+    assert snapshot.rows == len(documents)
+    assert snapshot.count_distinct(["a"]) == 4
+    assert snapshot.count_distinct(["c"]) == 4
+    assert snapshot.count_distinct(["a", "c"]) == 5
+    assert snapshot.count_distinct(["c", "a"]) == 5
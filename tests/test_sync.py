@@ -0,0 +1,150 @@
+from bson import Timestamp
+
+from tests.conftest import SCHEMA, FakeMongoDB, create_postgresql, select
+
+OPERATION_TIME = Timestamp(1700000000, 3)
+
+
+class FakeStream:
+    alive = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+class FakeSyncMongoDB(FakeMongoDB):
+    host = "localhost"
+    port = 27017
+    db = "shop"
+
+    def __init__(self):
+        super().__init__()
+        self.watched = []
+
+    def get_operation_time(self):
+        return OPERATION_TIME
+
+    def watch_changes(
+        self,
+        coll_names,
+        resume_token=None,
+        max_await_time_ms=1000,
+        start_at_operation_time=None,
+        pre_images=False,
+    ):
+        self.watched.append((resume_token, start_at_operation_time))
+        return FakeStream()
+
+
+class FakeChangeMongoDB:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def filter_data_pipeline(self, data_pipeline, match):
+        coll_name, pipeline, transform = data_pipeline
+        return coll_name, [{"$match": match}] + pipeline, transform
+
+    def stream_data_pipeline(self, data_pipeline, offset=0, ordered=False):
+        match, *pipeline = data_pipeline[1]
+
+        for document in self.documents:
+            if document["_id"] not in match["$match"]["_id"]["$in"]:
+                continue
+
+            if pipeline[0] != {"$unwind": "$orders"}:
+                yield {"_id": document["_id"], "name": document["name"]}
+                continue
+
+            for sku in document["orders"]:
+                yield {"users__id": document["_id"], "sku": sku}
+
+
+def change(number, operation_type, doc_id):
+    return {
+        "_id": {"_data": str(number)},
+        "operationType": operation_type,
+        "ns": {"db": "shop", "coll": "users"},
+        "documentKey": {"_id": doc_id},
+    }
+
+
+def test_sync_starts_where_the_load_started(pool):
+    mongodb = FakeSyncMongoDB()
+    rdbms = create_postgresql(record_sync_start=True)
+
+    assert rdbms.insert_data_by_relation(mongodb, [], SCHEMA)
+    assert rdbms.get_sync_token("localhost:27017/shop") == OPERATION_TIME
+
+    assert not rdbms.sync_changes(mongodb, [], SCHEMA)
+    assert mongodb.watched == [(None, OPERATION_TIME)]
+    assert pool.in_use == 0
+
+
+def test_resumed_load_keeps_stored_resume_token(pool):
+    mongodb = FakeSyncMongoDB()
+    rdbms = create_postgresql(record_sync_start=True, resume=True)
+    resume_token = {"_data": "8263"}
+
+    rdbms.create_sync_table()
+    connection = rdbms.create_raw_connection()
+    try:
+        with connection.cursor() as cursor:
+            rdbms.save_sync_token(cursor, "localhost:27017/shop", resume_token)
+        connection.commit()
+    finally:
+        rdbms.release_connection(connection)
+
+    assert rdbms.insert_data_by_relation(mongodb, [], SCHEMA)
+
+    assert not rdbms.sync_changes(mongodb, [], SCHEMA)
+    assert mongodb.watched == [(resume_token, None)]
+
+
+def test_load_does_not_record_sync_start_by_default(pool):
+    assert create_postgresql().insert_data_by_relation(FakeSyncMongoDB(), [], SCHEMA)
+
+    assert not pool.connection.execute(
+        "SELECT name FROM sqlite_master WHERE name = 'mongosequelizer_sync'"
+    ).fetchall()
+
+
+def test_changes_replace_rows_of_changed_documents(pool):
+    pool.connection.execute("CREATE UNIQUE INDEX users_id ON users (_id)")
+    pool.connection.executemany(
+        "INSERT INTO users VALUES (?, ?)", [(1, "user1"), (2, "user2")]
+    )
+    pool.connection.executemany(
+        "INSERT INTO orders VALUES (?, ?)", [("a", 1), ("b", 1), ("c", 2)]
+    )
+    pool.connection.commit()
+
+    schema = {
+        "users": dict(SCHEMA["users"], primary_key={"name": "users._id"}),
+        "orders": SCHEMA["orders"],
+    }
+    pipelines = {
+        "users": ("users", [{"$project": {"_id": "$_id", "name": "$name"}}], None),
+        "orders": (
+            "users",
+            [
+                {"$unwind": "$orders"},
+                {"$project": {"_id": 0, "users__id": "$_id", "sku": "$orders"}},
+            ],
+            None,
+        ),
+    }
+    mongodb = FakeChangeMongoDB([{"_id": 1, "name": "renamed", "orders": ["d"]}])
+    events = [change(1, "update", 1), change(2, "delete", 2), change(3, "update", 1)]
+
+    rdbms = create_postgresql()
+    rdbms.create_sync_table()
+
+    assert rdbms.apply_changes(mongodb, schema, pipelines, events, "shop")
+
+    assert pool.in_use == 0
+    assert select(pool, "SELECT _id, name FROM users") == [(1, "renamed")]
+    assert select(pool, "SELECT sku, users__id FROM orders") == [("d", 1)]
+    assert rdbms.get_sync_token("shop") == {"_data": "3"}